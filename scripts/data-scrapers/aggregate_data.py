@@ -5,10 +5,16 @@ Combines data from Yad2, Madlan, and Numbeo into a single JSON file
 for the Real Estate Readiness feature
 """
 
+import argparse
+import cProfile
+import glob
+import hashlib
 import json
 import os
+import pstats
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 import subprocess
 import sys
 
@@ -17,13 +23,114 @@ sys.path.append(os.path.dirname(__file__))
 from scrape_yad2 import Yad2Scraper
 from scrape_madlan import MadlanScraper
 from scrape_numbeo import NumbeoScraper
+from checkpoints import CheckpointStore
+from dedup import merge_listings
+from http_cache import HttpCache
+from http_client import HttpClient
+from instrumentation import Instrumentation
+from listing_stats import ListingStats
+from snapshot_store import SnapshotStore, unflatten_metrics
+from trends import TrendEngine
+from records import SourceRecord
+from pipeline import ParsePipeline
+from output_writer import (INDEX_FILE, compact_community_data, keep_timestamps, serialize,
+                           write_file, write_precompressed, write_split)
+from city_registry import City, city_names, load_cities, parse_shard, shard_cities
+
+# Output section filled by each source: (section, source name, record field
+# holding the metrics, metric fields in output order)
+SECTIONS = {
+    "yad2": ("property_data", "Yad2", "data",
+             ("avg_price_per_sqm", "avg_rent_3br", "listings_count", "price_trend")),
+    "madlan": ("market_analytics", "Madlan", "analytics",
+               ("market_index", "price_change_1y", "demand_level", "supply_level",
+                "avg_days_on_market", "neighborhood_scores")),
+    "numbeo": ("cost_of_living", "Numbeo", "cost_of_living",
+               ("housing", "groceries", "transportation", "utilities", "dining",
+                "total_monthly", "cost_index", "quality_of_life_index"))
+}
+
+# Record fields with a finer-grained breakdown, added to the source's
+# section after its city-level metrics when the record has one
+DETAIL_FIELDS = {
+    "madlan": "neighborhoods"
+}
+
+# Oldest last good block (in days) served in place of a source that failed;
+# past this the city is left out rather than shown with outdated figures
+MAX_FALLBACK_AGE_DAYS = 90
+
+# Metrics a source's records only have in some runs (the cross-source
+# figures need listings from both Yad2 and Madlan); left out when unset
+OPTIONAL_METRICS = {
+    "yad2": ("combined_avg_price_per_sqm", "combined_listings_count")
+}
 
 class DataAggregator:
-    def __init__(self):
-        self.yad2_scraper = Yad2Scraper()
-        self.madlan_scraper = MadlanScraper()
-        self.numbeo_scraper = NumbeoScraper()
+    def __init__(self, concurrent: bool = False, live: bool = False, stream: bool = False,
+                 cache_dir: str = None, incremental: bool = False, pipeline: bool = False,
+                 workers: int = None, shard: str = None, resume: bool = False, fallback: bool = True,
+                 report_file: str = "data/run_report.json", cities: List[City] = None,
+                 production: bool = False, split: bool = False, deterministic: bool = False,
+                 dedup: bool = True):
+        # The registry decides which cities this run covers; a shard gets a slice of it
+        self.cities = load_cities() if cities is None else cities
+        self.shard = parse_shard(shard) if shard else None
+        if self.shard:
+            self.cities = shard_cities(self.cities, *self.shard)
+        
+        # One client for all scrapers: pooled connections and a token bucket per host
+        self.client = HttpClient(cache=HttpCache(cache_dir) if cache_dir else None)
+        
+        # Every completed city is checkpointed, so --resume can pick up after a crash
+        checkpoint_dir = "data/checkpoints"
+        if self.shard:
+            checkpoint_dir = os.path.join(checkpoint_dir, "shard-{}-of-{}".format(*self.shard))
+        self.checkpoints = CheckpointStore(checkpoint_dir, resume=resume,
+                                           settings={"live": live, "stream": stream},
+                                           cache=self.client.cache)
+        
+        # Timings of every stage, written to report_file at the end of the run
+        self.instrumentation = Instrumentation()
+        self.report_file = report_file
+        self.options = {
+            "concurrent": concurrent, "live": live, "stream": stream, "pipeline": pipeline,
+            "incremental": incremental, "shard": shard, "resume": resume, "fallback": fallback,
+            "production": production, "split": split,
+            "deterministic": deterministic, "dedup": dedup
+        }
+        
+        self.snapshot_store = SnapshotStore()
+        self.yad2_scraper = Yad2Scraper(client=self.client, live=live, stream=stream,
+                                        trend_engine=TrendEngine(self.snapshot_store),
+                                        cities=city_names(self.cities, "hebrew"),
+                                        checkpoints=self.checkpoints,
+                                        instrumentation=self.instrumentation)
+        self.madlan_scraper = MadlanScraper(client=self.client, live=live,
+                                            cities=city_names(self.cities, "madlan_slug"),
+                                            checkpoints=self.checkpoints,
+                                            instrumentation=self.instrumentation)
+        self.numbeo_scraper = NumbeoScraper(client=self.client, live=live,
+                                            cities=city_names(self.cities, "numbeo_name"),
+                                            checkpoints=self.checkpoints,
+                                            instrumentation=self.instrumentation)
         self.output_dir = "public/data"
+        self.production = production
+        self.split = split
+        self.deterministic = deterministic
+        self.fallback = fallback
+        self.dedup = dedup
+        self.duplicates = {}
+        self.last_good = None
+        self.shard_dir = "data/shards"
+        self.concurrent = concurrent
+        self.pipeline = pipeline
+        self.workers = workers
+        self.incremental = incremental
+        self.state_file = "data/aggregation_state.json"
+        self.source_hashes = {}
+        self.changed_cities = []
+        self.output_unchanged = False
         
     def ensure_output_dir(self):
         """Ensure the output directory exists"""
@@ -36,6 +143,11 @@ class DataAggregator:
         print("STARTING DATA COLLECTION")
         print("=" * 60)
         
+        if self.pipeline:
+            return self.collect_all_data_pipelined()
+        if self.concurrent:
+            return self.collect_all_data_concurrently()
+        
         # Collect from each source
         print("\n[1/3] Collecting Yad2 property data...")
         yad2_data = self.yad2_scraper.scrape_all_cities()
@@ -52,17 +164,126 @@ class DataAggregator:
             "numbeo": numbeo_data
         }
     
-    def aggregate_city_data(self, city_name: str, raw_data: Dict) -> Dict:
-        """Aggregate data for a single city from all sources"""
+    def collect_all_data_concurrently(self) -> Dict:
+        """
+        Collect data from all sources in parallel
         
-        # Find data for this city from each source
-        yad2_city = next((c for c in raw_data["yad2"] if c["city"] == city_name), None)
-        madlan_city = next((c for c in raw_data["madlan"] if c["city"] == city_name), None)
-        numbeo_city = next((c for c in raw_data["numbeo"] if c["city"] == city_name), None)
+        Each scraper runs in its own worker thread and keeps its own
+        per-host rate limit, so the run takes as long as the slowest source
+        instead of the sum of all three.
+        """
+        sources = {
+            "yad2": self.yad2_scraper.scrape_all_cities,
+            "madlan": self.madlan_scraper.scrape_all_cities,
+            "numbeo": self.numbeo_scraper.scrape_all_cities
+        }
         
-        if not all([yad2_city, madlan_city, numbeo_city]):
-            print(f"Warning: Missing data for {city_name}")
-            return None
+        print("\nCollecting Yad2, Madlan and Numbeo data concurrently...")
+        with ThreadPoolExecutor(max_workers=len(sources)) as executor:
+            futures = {name: executor.submit(scrape) for name, scrape in sources.items()}
+            return {name: future.result() for name, future in futures.items()}
+    
+    def collect_all_data_pipelined(self) -> Dict:
+        """
+        Collect live data with fetching and parsing in separate stages
+        
+        Fetcher threads download pages while a pool of parser processes
+        turns them into records, so HTML parsing runs on every core
+        instead of serializing on the GIL.
+        """
+        scrapers = {
+            "yad2": self.yad2_scraper,
+            "madlan": self.madlan_scraper,
+            "numbeo": self.numbeo_scraper
+        }
+        
+        print("\nCollecting Yad2, Madlan and Numbeo data through the parse pipeline...")
+        return ParsePipeline(scrapers, workers=self.workers).run()
+    
+    def deduplicate_listings(self, raw_data: Dict) -> Dict[str, int]:
+        """
+        Count apartments listed on both Yad2 and Madlan only once
+        
+        For every city with listings from both sources (live mode), the
+        sale listings are merged with cross-source duplicates removed (see
+        dedup.py), and the combined metrics of the property data are
+        computed from the merged set. Each source's own metrics are left
+        as scraped.
+        
+        Returns:
+            Number of duplicates found per city
+        """
+        index = self.index_by_city(raw_data)
+        duplicates = {}
+        for city, yad2 in index["yad2"].items():
+            madlan = index["madlan"].get(city)
+            if not yad2.listings or madlan is None or not madlan.listings:
+                continue
+            
+            merged, duplicates[city] = merge_listings(yad2.listings, madlan.listings)
+            listings = ListingStats.from_listings(merged)
+            yad2.data.combined_listings_count = len(listings)
+            price_per_sqm = listings.robust_mean("price_per_sqm")
+            if price_per_sqm is not None:
+                yad2.data.combined_avg_price_per_sqm = round(price_per_sqm)
+        
+        if duplicates:
+            print(f"Removed {sum(duplicates.values())} listings found on both Yad2 and Madlan "
+                  f"in {len(duplicates)} cities")
+        return duplicates
+    
+    def index_by_city(self, raw_data: Dict, as_of: str = None) -> Dict[str, Dict[str, SourceRecord]]:
+        """
+        Index each source's records by city
+        
+        Built once per run so the per-city join is a dict lookup. When a
+        source holds several snapshots of the same city, the most recent
+        one wins.
+        
+        Args:
+            raw_data: Records per source, as returned by collect_all_data
+            as_of: Ignore snapshots with a later ISO timestamp
+            
+        Returns:
+            Mapping of source name to {city: record}
+        """
+        index = {}
+        for source, records in raw_data.items():
+            by_city = index[source] = {}
+            for record in records:
+                if as_of is not None and record.timestamp > as_of:
+                    continue
+                current = by_city.get(record.city)
+                if current is None or record.timestamp >= current.timestamp:
+                    by_city[record.city] = record
+        return index
+    
+    def aggregate_city_data(self, city_name: str, index: Dict[str, Dict[str, SourceRecord]]) -> Dict:
+        """Aggregate data for a single city from all sources"""
+        
+        # Build each source's section, falling back to its last good block
+        # from the history when the source has no record for this city
+        sections = {}
+        for source, (section, name, field, metrics) in SECTIONS.items():
+            record = index[source].get(city_name)
+            if record is not None:
+                values = getattr(record, field)
+                block = {metric: getattr(values, metric) for metric in metrics}
+                for metric in OPTIONAL_METRICS.get(source, ()):
+                    if getattr(values, metric) is not None:
+                        block[metric] = getattr(values, metric)
+                details = getattr(record, DETAIL_FIELDS[source]) if source in DETAIL_FIELDS else None
+                if details:
+                    block[DETAIL_FIELDS[source]] = [detail.to_dict() for detail in details]
+                sections[section] = dict(block, source=name)
+                continue
+            
+            block = self.fallback_section(city_name, source) if self.fallback else None
+            if block is None:
+                print(f"Warning: Missing data for {city_name}")
+                return None
+            print(f"Warning: No {name} data for {city_name}; serving the block from {block['as_of']}")
+            sections[section] = block
         
         # Combine data into unified structure
         aggregated = {
@@ -84,42 +305,57 @@ class DataAggregator:
                     "url": "https://www.numbeo.com/cost-of-living",
                     "type": "Cost of Living"
                 }
-            ],
-            "property_data": {
-                "avg_price_per_sqm": yad2_city["data"]["avg_price_per_sqm"],
-                "avg_rent_3br": yad2_city["data"]["avg_rent_3br"],
-                "listings_count": yad2_city["data"]["listings_count"],
-                "price_trend": yad2_city["data"]["price_trend"],
-                "source": "Yad2"
-            },
-            "market_analytics": {
-                "market_index": madlan_city["analytics"]["market_index"],
-                "price_change_1y": madlan_city["analytics"]["price_change_1y"],
-                "demand_level": madlan_city["analytics"]["demand_level"],
-                "supply_level": madlan_city["analytics"]["supply_level"],
-                "avg_days_on_market": madlan_city["analytics"]["avg_days_on_market"],
-                "neighborhood_scores": madlan_city["analytics"]["neighborhood_scores"],
-                "source": "Madlan"
-            },
-            "cost_of_living": {
-                "housing": numbeo_city["cost_of_living"]["housing"],
-                "groceries": numbeo_city["cost_of_living"]["groceries"],
-                "transportation": numbeo_city["cost_of_living"]["transportation"],
-                "utilities": numbeo_city["cost_of_living"]["utilities"],
-                "dining": numbeo_city["cost_of_living"]["dining"],
-                "total_monthly": numbeo_city["cost_of_living"]["total_monthly"],
-                "cost_index": numbeo_city["cost_of_living"]["cost_index"],
-                "quality_of_life_index": numbeo_city["cost_of_living"]["quality_of_life_index"],
-                "source": "Numbeo"
-            }
+            ]
         }
+        aggregated.update(sections)
         
         return aggregated
     
+    def fallback_section(self, city_name: str, source: str) -> Optional[Dict]:
+        """
+        Last good block of one source for a city, rebuilt from the history
+        
+        The block is marked "stale" with the time it was last scraped
+        ("as_of") and its age in days. A block that was already a fallback
+        keeps its original as_of.
+        
+        Returns:
+            The section block, or None if the history has no complete block
+            or it is more than MAX_FALLBACK_AGE_DAYS old
+        """
+        if self.last_good is None:
+            self.last_good = self.snapshot_store.last_run()
+        timestamp, snapshot = self.last_good
+        
+        section, name, _, metrics = SECTIONS[source]
+        prefix = f"{section}."
+        history = unflatten_metrics({
+            metric[len(prefix):]: value
+            for metric, value in snapshot.get(city_name, {}).items() if metric.startswith(prefix)
+        })
+        if not all(metric in history for metric in metrics):
+            return None
+        
+        as_of = history.get("as_of") or timestamp
+        age_days = (datetime.now() - datetime.fromisoformat(as_of)).days
+        if age_days > MAX_FALLBACK_AGE_DAYS:
+            print(f"Warning: Last {name} data for {city_name} is {age_days} days old; not serving it")
+            return None
+        
+        block = {metric: history[metric] for metric in metrics}
+        block.update({metric: history[metric] for metric in OPTIONAL_METRICS.get(source, ()) if metric in history})
+        block.update({
+            "source": name,
+            "stale": True,
+            "as_of": as_of,
+            "age_days": age_days
+        })
+        return block
+    
     def generate_community_data(self, raw_data: Dict) -> Dict:
         """Generate the final community data JSON for the frontend"""
         
-        cities = ["beit_shemesh", "modiin", "rehovot", "netanya", "haifa"]
+        cities = [city.key for city in self.cities]
         
         community_data = {
             "last_updated": datetime.now().isoformat(),
@@ -143,30 +379,199 @@ class DataAggregator:
             "cities": []
         }
         
+        index = self.index_by_city(raw_data)
+
+        # In incremental mode, cities whose source records hash the same as
+        # last run keep their existing block from the previous output
+        previous_state = self.load_state() if self.incremental else {}
+        previous_output = self.load_previous_output() if self.incremental or self.deterministic else None
+        previous_cities = {c["city"]: c for c in previous_output["cities"]} if previous_output else {}
+
+        self.source_hashes = {}
+        self.changed_cities = []
         for city in cities:
-            city_data = self.aggregate_city_data(city, raw_data)
+            hashes = {
+                source: self.source_hash(records[city])
+                for source, records in index.items() if city in records
+            }
+
+            # Cities served partly from the history are rebuilt so their age stays current
+            if city in previous_cities and len(hashes) == len(index) and hashes == previous_state.get(city):
+                community_data["cities"].append(previous_cities[city])
+                self.source_hashes[city] = hashes
+                continue
+
+            with self.instrumentation.timed("aggregate_city", city=city):
+                city_data = self.aggregate_city_data(city, index)
             if city_data:
                 community_data["cities"].append(city_data)
-        
+                self.source_hashes[city] = hashes
+                self.changed_cities.append(city)
+
+        if previous_output and not self.changed_cities and len(community_data["cities"]) == len(previous_cities):
+            # Nothing changed: keep the previous timestamp so the output is byte-identical
+            community_data["last_updated"] = previous_output["last_updated"]
+        if previous_output and self.deterministic:
+            # Timestamps only move when the data they describe changed
+            keep_timestamps(community_data, previous_output)
+        self.output_unchanged = self.output_document(community_data) == previous_output and (
+            not self.split or os.path.exists(os.path.join(self.output_dir, INDEX_FILE))
+        )
+
         return community_data
+
+    def source_hash(self, record: SourceRecord) -> str:
+        """Content hash of a source record, ignoring its scrape timestamp"""
+        content = {key: value for key, value in record.to_dict().items() if key != "timestamp"}
+        serialized = json.dumps(content, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+    def load_state(self) -> Dict[str, Dict[str, str]]:
+        """Load the per-city, per-source hashes recorded by the previous run"""
+        if not os.path.exists(self.state_file):
+            return {}
+        with open(self.state_file, 'r', encoding='utf-8') as f:
+            return json.load(f).get("cities", {})
+
+    def save_state(self):
+        """Record the per-city, per-source hashes of this run"""
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                "last_updated": datetime.now().isoformat(),
+                "cities": self.source_hashes
+            }, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+    def load_previous_output(self) -> Dict:
+        """Load the community data written by the previous run, if any"""
+        public_file = os.path.join(self.output_dir, "community_data.json")
+        if not os.path.exists(public_file):
+            return None
+        with open(public_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def output_document(self, community_data: Dict) -> Dict:
+        """The document written to community_data.json (compacted in production mode)"""
+        return compact_community_data(community_data) if self.production else community_data
     
     def save_data(self, community_data: Dict):
         """Save aggregated data to JSON files"""
         
-        # Save to public directory for frontend access
+        # Save to public directory for frontend access; production output is
+        # minified and gets precompressed siblings for the static host
         public_file = os.path.join(self.output_dir, "community_data.json")
-        with open(public_file, 'w', encoding='utf-8') as f:
-            json.dump(community_data, f, ensure_ascii=False, indent=2)
+        payload = serialize(self.output_document(community_data), minify=self.production,
+                            sort_keys=self.deterministic)
+        write_file(public_file, payload)
+        
+        print(f"\n✓ Data saved to {public_file} ({len(payload):,} bytes)")
+        if self.production:
+            for compressed_file in write_precompressed(public_file, payload):
+                print(f"✓ Precompressed copy saved to {compressed_file} ({os.path.getsize(compressed_file):,} bytes)")
+        
+        # Optionally also one file per city, so pages only load the cities they show
+        if self.split:
+            names = {city.key: {"name": city.numbeo_name, "name_hebrew": city.hebrew} for city in self.cities}
+            index = write_split(self.output_dir, self.output_document(community_data), names,
+                                minify=self.production, precompress=self.production,
+                                sort_keys=self.deterministic, hashed=self.deterministic)
+            print(f"✓ Split output saved to {os.path.join(self.output_dir, INDEX_FILE)} "
+                  f"and {len(index['cities'])} city files")
         
-        print(f"\n✓ Data saved to {public_file}")
+        # Record this run's metrics in the compact history instead of a full backup copy
+        self.record_history(community_data)
+    
+    def record_history(self, community_data: Dict):
+        """
+        Append this run's metrics to the history
+        
+        Every run gets an entry, even one whose output is unchanged, so the
+        trends see one observation per run. Deterministic output may carry
+        an old last_updated, but the run happened now.
+        """
+        changed = self.snapshot_store.append(community_data, timestamp=datetime.now().isoformat())
+        print(f"✓ History updated in {self.snapshot_store.path} ({changed} values changed)")
+    
+    def shard_file(self, index: int, count: int) -> str:
+        """Path of one shard's output"""
+        return os.path.join(self.shard_dir, f"community_data.shard-{index}-of-{count}.json")
+    
+    def save_shard(self, community_data: Dict):
+        """Save this shard's cities for a later merge"""
+        index, count = self.shard
+        os.makedirs(self.shard_dir, exist_ok=True)
+        shard_file = self.shard_file(index, count)
+        with open(shard_file, 'w', encoding='utf-8') as f:
+            json.dump(dict(community_data, shard={"index": index, "count": count}),
+                      f, ensure_ascii=False, indent=2)
+        
+        print(f"\n✓ Shard {index}/{count} saved to {shard_file}")
+    
+    def merge_shards(self, shard_files: List[str] = None) -> Dict:
+        """
+        Combine shard outputs into a single community data document
+        
+        Args:
+            shard_files: Shard outputs to merge (defaults to every file in shard_dir)
+            
+        Returns:
+            Community data with the cities of all shards in registry order
+        """
+        if shard_files is None:
+            shard_files = sorted(glob.glob(os.path.join(self.shard_dir, "community_data.shard-*.json")))
+        if not shard_files:
+            raise ValueError(f"No shard outputs found in {self.shard_dir}")
+        
+        shards = {}
+        for shard_file in shard_files:
+            with open(shard_file, 'r', encoding='utf-8') as f:
+                shard_data = json.load(f)
+            shards[shard_data["shard"]["index"]] = shard_data
+        
+        counts = {shard_data["shard"]["count"] for shard_data in shards.values()}
+        if len(counts) != 1:
+            raise ValueError(f"Shard outputs come from different splits: {sorted(counts)} shards")
+        count = counts.pop()
+        missing = sorted(set(range(1, count + 1)) - set(shards))
+        if missing:
+            raise ValueError(f"Missing shard outputs: {', '.join(f'{i}/{count}' for i in missing)}")
         
-        # Also save a backup with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = f"data/community_data_backup_{timestamp}.json"
-        with open(backup_file, 'w', encoding='utf-8') as f:
-            json.dump(community_data, f, ensure_ascii=False, indent=2)
+        by_city = {}
+        for index in sorted(shards):
+            for city_data in shards[index]["cities"]:
+                by_city[city_data["city"]] = city_data
         
-        print(f"✓ Backup saved to {backup_file}")
+        # Registry cities first, in registry order, then any the registry no longer lists
+        order = [city.key for city in load_cities() if city.key in by_city]
+        order += sorted(set(by_city) - set(order))
+        
+        merged = {key: value for key, value in shards[1].items() if key != "shard"}
+        merged["last_updated"] = max(shard_data["last_updated"] for shard_data in shards.values())
+        merged["cities"] = [by_city[city] for city in order]
+        
+        print(f"✓ Merged {count} shards: {len(merged['cities'])} cities")
+        return merged
+    
+    def save_report(self, raw_data: Dict, community_data: Dict) -> Dict:
+        """
+        Write the machine-readable run report
+        
+        Holds the run options, stage timings (per source and per city),
+        HTTP counters per host and record counts, so run durations can be
+        compared from week to week.
+        """
+        return self.instrumentation.save(
+            self.report_file,
+            options=self.options,
+            http=self.client.stats(),
+            records={
+                "cities": len(self.cities),
+                "per_source": {source: len(records) for source, records in raw_data.items()},
+                "resumed": self.checkpoints.resumed,
+                "duplicates": self.duplicates,
+                "aggregated": len(community_data["cities"]),
+                "changed": self.changed_cities if self.incremental else None
+            }
+        )
     
     def run(self):
         """Main execution method"""
@@ -179,20 +584,52 @@ class DataAggregator:
         # Ensure directories exist
         self.ensure_output_dir()
         
-        # Collect data from all sources
-        raw_data = self.collect_all_data()
+        # Collect data from all sources, skipping cities checkpointed by an interrupted run
+        self.checkpoints.start()
+        with self.instrumentation.timed("collect"):
+            raw_data = self.collect_all_data()
+        
+        # Apartments listed on both Yad2 and Madlan must not count twice
+        if self.dedup:
+            with self.instrumentation.timed("dedup"):
+                self.duplicates = self.deduplicate_listings(raw_data)
+        
+        # The listings were only kept for deduplication
+        for source in ("yad2", "madlan"):
+            for record in raw_data[source]:
+                record.listings = None
         
         # Aggregate and format data
         print("\n" + "=" * 60)
         print("AGGREGATING DATA")
         print("=" * 60)
-        community_data = self.generate_community_data(raw_data)
+        with self.instrumentation.timed("aggregate"):
+            community_data = self.generate_community_data(raw_data)
         
         # Save to files
         print("\n" + "=" * 60)
         print("SAVING DATA")
         print("=" * 60)
-        self.save_data(community_data)
+        with self.instrumentation.timed("save"):
+            if self.shard:
+                self.save_shard(community_data)
+            elif self.incremental and self.output_unchanged:
+                print("\n✓ No city data changed; existing output left untouched")
+                self.record_history(community_data)
+            else:
+                if self.incremental:
+                    print(f"\nChanged cities: {', '.join(self.changed_cities) or 'none'}")
+                self.save_data(community_data)
+            if self.incremental:
+                self.save_state()
+        
+        # Checkpoints are only needed until every city of every source has been collected
+        missing = sum(len(self.cities) - len(records) for records in raw_data.values())
+        if missing:
+            print(f"\n{missing} source records missing; checkpoints kept in "
+                  f"{self.checkpoints.checkpoint_dir} (rerun with --resume to retry only those)")
+        else:
+            self.checkpoints.clear()
         
         # Summary
         print("\n" + "=" * 60)
@@ -201,14 +638,102 @@ class DataAggregator:
         print(f"✓ Successfully aggregated data for {len(community_data['cities'])} cities")
         print(f"✓ Data sources: {len(community_data['data_sources'])}")
         print(f"✓ Last updated: {community_data['last_updated']}")
+        if self.report_file:
+            report = self.save_report(raw_data, community_data)
+            print(f"✓ Run report saved to {self.report_file} ({report['duration_s']:.1f}s)")
         print("=" * 60)
         print("COMPLETE")
         print("=" * 60 + "\n")
 
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Aggregate real estate data from Yad2, Madlan and Numbeo")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="Collect from all sources in parallel instead of one after another")
+    parser.add_argument("--live", action="store_true",
+                        help="Fetch and parse the source websites instead of using built-in estimates")
+    parser.add_argument("--stream", action="store_true",
+                        help="With --live, walk every Yad2 results page per city instead of only the first")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="With --live, parse fetched pages in a pool of worker processes")
+    parser.add_argument("--workers", type=int,
+                        help="Parser processes for --pipeline (defaults to the number of CPUs)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only re-aggregate cities whose source data changed since the last run")
+    parser.add_argument("--shard", metavar="i/N",
+                        help="Only collect shard i of N of the city registry and save it under data/shards")
+    parser.add_argument("--merge", nargs="*", metavar="SHARD_FILE",
+                        help="Merge shard outputs (default: all of data/shards) into community_data.json")
+    parser.add_argument("--no-fallback", action="store_true",
+                        help="Drop cities with a missing source instead of serving that source's last good block")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Keep apartments listed on both Yad2 and Madlan twice in listing-based metrics")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reuse cities checkpointed by an interrupted run instead of scraping them again")
+    parser.add_argument("--report", default="data/run_report.json",
+                        help="Where to write the JSON run report with timings and HTTP counters (empty to skip)")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="Profile the run with cProfile and save the stats to FILE "
+                             "(main thread only, so meant for sequential runs)")
+    parser.add_argument("--production", action="store_true",
+                        help="Write minified community_data.json without per-city source lists, plus .gz/.br copies")
+    parser.add_argument("--split", action="store_true",
+                        help="Also write one file per city under public/data/cities plus an index.json manifest")
+    parser.add_argument("--deterministic", action="store_true",
+                        help="Sort keys, keep timestamps of unchanged data and name --split city files by content hash")
+    parser.add_argument("--cache-dir", default="data/http_cache",
+                        help="Directory for the conditional-GET HTTP cache used in --live mode")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Download every page in full, bypassing the HTTP cache")
+    args = parser.parse_args()
+    if args.stream and not args.live:
+        parser.error("--stream requires --live")
+    if args.pipeline and (not args.live or args.stream):
+        parser.error("--pipeline requires --live and cannot be combined with --stream")
+    if args.shard:
+        try:
+            parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.incremental or args.merge is not None:
+            parser.error("--shard cannot be combined with --incremental or --merge")
+    return args
+
 def main():
     """Main entry point"""
-    aggregator = DataAggregator()
-    aggregator.run()
+    args = parse_args()
+    cache_dir = args.cache_dir if args.live and not args.no_cache else None
+    aggregator = DataAggregator(concurrent=args.concurrent, live=args.live, stream=args.stream,
+                                cache_dir=cache_dir, incremental=args.incremental,
+                                pipeline=args.pipeline, workers=args.workers, shard=args.shard,
+                                resume=args.resume, fallback=not args.no_fallback,
+                                report_file=args.report, production=args.production,
+                                split=args.split, deterministic=args.deterministic,
+                                dedup=not args.no_dedup)
+    try:
+        if args.merge is not None:
+            aggregator.ensure_output_dir()
+            try:
+                merged = aggregator.merge_shards(args.merge or None)
+            except ValueError as e:
+                print(f"Error merging shards: {str(e)}")
+                sys.exit(1)
+            aggregator.save_data(merged)
+        elif args.profile:
+            # cProfile only sees the main thread; scraping in executor threads
+            # and parser processes would be missing from the stats
+            if args.concurrent or args.pipeline:
+                print("Warning: --profile only covers the main thread; with --concurrent or "
+                      "--pipeline the scraping itself is not profiled. Profile a sequential run instead.")
+            profiler = cProfile.Profile()
+            profiler.runcall(aggregator.run)
+            profiler.dump_stats(args.profile)
+            print(f"Profile saved to {args.profile}; top functions by cumulative time:")
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+        else:
+            aggregator.run()
+    finally:
+        aggregator.client.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+HTML Parser Benchmark
+Compares BeautifulSoup backends, with and without SoupStrainer partial
+parsing, on the saved fixture pages for each source
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from html_parsing import make_soup
+from scrape_yad2 import RESULTS_STRAINER
+from scrape_madlan import CITY_PAGE_STRAINER
+from scrape_numbeo import COST_ITEMS_STRAINER
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures")
+
+# Fixture page and the strainer its scraper parses it with
+PAGES = {
+    "yad2_forsale.html": RESULTS_STRAINER,
+    "yad2_rent.html": RESULTS_STRAINER,
+    "madlan_city.html": CITY_PAGE_STRAINER,
+    "numbeo_city.html": COST_ITEMS_STRAINER
+}
+
+def available_backends() -> List[str]:
+    """BeautifulSoup backends installed in this environment"""
+    backends = ['html.parser']
+    for backend, module in (('lxml', 'lxml'), ('html5lib', 'html5lib')):
+        try:
+            __import__(module)
+            backends.append(backend)
+        except ImportError:
+            pass
+    return backends
+
+def time_parse(page: bytes, backend: str, strainer, repeat: int) -> float:
+    """Average milliseconds to parse a page"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        make_soup(page, strainer, backend)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+def run(repeat: int) -> Dict[str, Dict[str, float]]:
+    """Time every backend on every fixture, full tree and strained"""
+    results = {}
+    backends = available_backends()
+    for name, strainer in PAGES.items():
+        with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+            page = f.read()
+        for backend in backends:
+            results.setdefault(name, {})[backend] = time_parse(page, backend, None, repeat)
+            if backend != 'html5lib':  # html5lib ignores parse_only
+                results[name][f"{backend} + strainer"] = time_parse(page, backend, strainer, repeat)
+    return results
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(description="Benchmark HTML parser backends on fixture pages")
+    parser.add_argument("--repeat", type=int, default=20, help="Parses per measurement")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    print(f"{'page':<20} {'backend':<24} {'ms/page':>8}")
+    print("-" * 54)
+    for name, timings in results.items():
+        baseline = timings['html.parser']
+        for backend, ms in sorted(timings.items(), key=lambda item: item[1]):
+            print(f"{name:<20} {backend:<24} {ms:>8.2f}  ({baseline / ms:.1f}x)")
+        print()
+
+if __name__ == "__main__":
+    main()
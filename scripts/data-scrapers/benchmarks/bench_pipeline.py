@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+End-to-End Pipeline Benchmark
+Runs DataAggregator.run in live mode against a local stand-in server that
+replays the fixture pages, for growing numbers of synthetic cities
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aggregate_data import DataAggregator
+from city_registry import City
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures")
+
+# Fixture served for each kind of request, matched on the URL path
+ROUTES = (
+    ("/realestate/forsale", "yad2_forsale.html"),
+    ("/realestate/rent", "yad2_rent.html"),
+    ("/city/", "madlan_city.html"),
+    ("/cost-of-living/", "numbeo_city.html")
+)
+
+# Pages each source downloads and parses per city
+PAGES_PER_CITY = {"yad2": 2, "madlan": 1, "numbeo": 1}
+
+# Marks the line a benchmark subprocess reports its result on
+RESULT_PREFIX = "BENCH_RESULT "
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves the fixture page matching the request path, for any city"""
+    pages: Dict[str, bytes] = {}
+
+    def do_GET(self):
+        for prefix, name in ROUTES:
+            if self.path.startswith(prefix):
+                body = self.pages[name]
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+        self.send_error(404)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server() -> ThreadingHTTPServer:
+    """Start the stand-in server on a free local port"""
+    for _, name in ROUTES:
+        with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+            FixtureHandler.pages[name] = f.read()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def synthetic_cities(count: int) -> List[City]:
+    """Registry entries for count made-up cities"""
+    return [
+        City(key=f"city_{i:04d}", hebrew=f"עיר {i}", madlan_slug=f"עיר-{i}", numbeo_name=f"City {i}")
+        for i in range(count)
+    ]
+
+def run_once(cities: int, server_url: str, mode: str, workers: int = None) -> Dict:
+    """
+    Run one aggregation against the stand-in server (in this process)
+
+    Returns:
+        Throughput, parse time per page and peak RSS for the run
+    """
+    host = server_url.split("://", 1)[1]
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as workdir:
+        os.chdir(workdir)
+        try:
+            aggregator = DataAggregator(live=True, concurrent=mode == "concurrent", pipeline=mode == "pipeline",
+                                        workers=workers, cities=synthetic_cities(cities))
+            aggregator.client.rate_limiter.limits[host] = {"rate": 1e6, "burst": 1e6}
+            aggregator.yad2_scraper.base_url = server_url
+            aggregator.madlan_scraper.base_url = server_url
+            aggregator.numbeo_scraper.base_url = f"{server_url}/cost-of-living"
+
+            try:
+                with open(os.devnull, 'w') as devnull:
+                    stdout, sys.stdout = sys.stdout, devnull
+                    try:
+                        aggregator.run()
+                    finally:
+                        sys.stdout = stdout
+            finally:
+                aggregator.client.close()
+
+            with open(aggregator.report_file, 'r', encoding='utf-8') as f:
+                report = json.load(f)
+        finally:
+            # Leave the directory before it is removed
+            os.chdir(cwd)
+
+    duration = report["duration_s"]
+    pages = report["http"]["total"]["requests"]
+    parse_ms = {}
+    for source, per_city in PAGES_PER_CITY.items():
+        parse = report["timings"].get(source, {}).get("parse")
+        if parse and parse["calls"]:
+            parse_ms[source] = round(parse["total_s"] * 1000 / (parse["calls"] * per_city), 2)
+
+    # ru_maxrss is in kilobytes on Linux; parser processes are counted separately
+    own_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    workers_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return {
+        "cities": cities,
+        "mode": mode,
+        "duration_s": duration,
+        "cities_per_s": round(cities / duration, 1),
+        "pages": pages,
+        "pages_per_s": round(pages / duration, 1),
+        "bytes": report["http"]["total"]["bytes"],
+        "parse_ms_per_page": parse_ms,
+        "peak_rss_mb": round(own_rss, 1),
+        "peak_worker_rss_mb": round(workers_rss, 1) if mode == "pipeline" else None,
+        "aggregated": report["records"]["aggregated"]
+    }
+
+def run(sizes: List[int], mode: str, workers: int = None) -> List[Dict]:
+    """
+    Benchmark each city count in a fresh subprocess
+
+    A fresh process per size keeps peak RSS from carrying over between
+    sizes; the stand-in server runs here so it is not counted.
+    """
+    server = start_server()
+    server_url = f"http://127.0.0.1:{server.server_address[1]}"
+    results = []
+    try:
+        for cities in sizes:
+            command = [sys.executable, os.path.abspath(__file__), "--single", str(cities),
+                       "--server", server_url, "--mode", mode]
+            if workers:
+                command += ["--workers", str(workers)]
+            output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+            line = next(line for line in output.splitlines() if line.startswith(RESULT_PREFIX))
+            results.append(json.loads(line[len(RESULT_PREFIX):]))
+    finally:
+        server.shutdown()
+    return results
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(description="Benchmark DataAggregator.run on fixture pages served locally")
+    parser.add_argument("--sizes", default="5,100,1000", help="Comma-separated synthetic city counts")
+    parser.add_argument("--mode", choices=("sequential", "concurrent", "pipeline"), default="concurrent",
+                        help="Collection mode to benchmark")
+    parser.add_argument("--workers", type=int, help="Parser processes in pipeline mode")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--server", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        result = run_once(args.single, args.server, args.mode, args.workers)
+        print(RESULT_PREFIX + json.dumps(result))
+        return
+
+    results = run([int(size) for size in args.sizes.split(",")], args.mode, args.workers)
+
+    print(f"{'cities':>7} {'seconds':>8} {'cities/s':>9} {'pages/s':>8} {'peak RSS MB':>12}  parse ms/page")
+    print("-" * 80)
+    for result in results:
+        parse = ", ".join(f"{source} {ms:.1f}" for source, ms in result["parse_ms_per_page"].items())
+        print(f"{result['cities']:>7} {result['duration_s']:>8.1f} {result['cities_per_s']:>9.1f} "
+              f"{result['pages_per_s']:>8.1f} {result['peak_rss_mb']:>12.1f}  {parse or '-'}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Run Checkpoints
+Per-source, per-city records saved as each city completes, so an
+interrupted run can be resumed without scraping finished cities again
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterator, Type
+
+from http_cache import HttpCache
+from records import SourceRecord
+
+# Cities whose pages are fetched together in batch live mode; each batch is
+# parsed and checkpointed before the next one is fetched
+FETCH_BATCH = 8
+
+# Least time between two saves of the HTTP cache index from save()
+CACHE_SAVE_INTERVAL = 10.0
+
+def batches(cities: Dict[str, str], size: int = FETCH_BATCH) -> Iterator[Dict[str, str]]:
+    """Split a city mapping into consecutive batches of at most size cities"""
+    items = iter(cities.items())
+    batch = dict(islice(items, size))
+    while batch:
+        yield batch
+        batch = dict(islice(items, size))
+
+class CheckpointStore:
+    def __init__(self, checkpoint_dir: str = "data/checkpoints", resume: bool = False,
+                 settings: Dict = None, cache: HttpCache = None):
+        """
+        One JSON file per source and city under checkpoint_dir/<source>/<city>.json
+
+        Args:
+            checkpoint_dir: Directory holding this run's checkpoints
+            resume: Reuse checkpoints left by an unfinished run; otherwise
+                they are discarded when the run starts
+            settings: Run options a checkpoint is only valid for (e.g. live mode);
+                checkpoints written with different settings are discarded
+            cache: HTTP cache whose index is saved along with the checkpoints, so
+                pages fetched before a crash are revalidated on resume instead of
+                downloaded again
+        """
+        self.checkpoint_dir = checkpoint_dir
+        self.resume = resume
+        self.settings = settings or {}
+        self.manifest_file = os.path.join(checkpoint_dir, "run.json")
+        self.cache = cache
+        self.cache_saved_at = float("-inf")
+        self.lock = threading.Lock()
+        self.resumed = 0
+
+    def start(self):
+        """Prepare the directory for a run: keep resumable checkpoints, drop the rest"""
+        resume = self.resume
+        if resume and not self._matches_manifest():
+            print(f"Warning: Checkpoints in {self.checkpoint_dir} come from a run with other options; starting over")
+            resume = False
+        if not resume:
+            self.clear()
+        self._write_json(self.manifest_file, {
+            "started": datetime.now().isoformat(),
+            "settings": self.settings
+        }, keep=resume)
+
+    def _matches_manifest(self) -> bool:
+        """Check that existing checkpoints were written with this run's settings"""
+        if not os.path.exists(self.manifest_file):
+            return True
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get("settings") == self.settings
+        except (OSError, ValueError):
+            return False
+
+    def _path(self, source: str, city: str) -> str:
+        return os.path.join(self.checkpoint_dir, source, f"{city}.json")
+
+    def _write_json(self, path: str, content: Dict, keep: bool = False):
+        """Write a file atomically (or leave it alone if keep and it exists)"""
+        if keep and os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_file = path + ".tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(content, f, ensure_ascii=False)
+        os.replace(tmp_file, path)
+
+    def completed(self, source: str, record_type: Type[SourceRecord],
+                  cities: Dict[str, str]) -> Dict[str, SourceRecord]:
+        """
+        Records already checkpointed for a source
+
+        Args:
+            source: Source name ("yad2", "madlan" or "numbeo")
+            record_type: Record class the source emits
+            cities: Cities the caller is about to scrape
+
+        Returns:
+            Mapping of city name to record for the cities that can be skipped
+        """
+        records = {}
+        if not self.resume:
+            return records
+        for city in cities:
+            path = self._path(source, city)
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    records[city] = record_type.from_dict(json.load(f))
+            except (OSError, ValueError, TypeError):
+                print(f"Warning: Ignoring unreadable checkpoint {path}")
+
+        if records:
+            with self.lock:
+                self.resumed += len(records)
+            print(f"Resuming {source}: {len(records)} of {len(cities)} cities already done")
+        return records
+
+    def save(self, source: str, record: SourceRecord):
+        """
+        Checkpoint one completed city
+
+        Transient fields are included, so a resumed city still has the
+        listings the cross-source deduplication needs.
+        """
+        with self.lock:
+            self._write_json(self._path(source, record.city), record.to_dict(transient=True))
+            save_cache = self.cache is not None and time.monotonic() - self.cache_saved_at >= CACHE_SAVE_INTERVAL
+            if save_cache:
+                self.cache_saved_at = time.monotonic()
+        # The index is rewritten whole, so it is saved every few seconds rather than per city
+        if save_cache:
+            self.cache.save()
+
+    def clear(self):
+        """Remove all checkpoints (after a complete run, or when starting over)"""
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
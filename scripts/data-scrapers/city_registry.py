@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+City Registry
+Single list of target cities and the name each source knows them by,
+loaded from cities.json
+"""
+
+import json
+import os
+from typing import Dict, List, Tuple
+
+from records import Record
+
+CITIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cities.json")
+
+class City(Record):
+    """
+    One target city
+
+    key is the internal name used in our output; the other fields are the
+    names used in Yad2 searches, Madlan city pages and Numbeo page titles.
+    """
+    __slots__ = ("key", "hebrew", "madlan_slug", "numbeo_name")
+
+def load_cities(path: str = CITIES_FILE) -> List[City]:
+    """
+    Load the city registry
+
+    Returns:
+        Cities in registry order, which is also the output order
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        cities = [City(**entry) for entry in json.load(f)]
+
+    keys = [city.key for city in cities]
+    duplicates = sorted({key for key in keys if keys.count(key) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate cities in {path}: {', '.join(duplicates)}")
+    return cities
+
+def city_names(cities: List[City], field: str) -> Dict[str, str]:
+    """
+    Map city keys to one source's name for each city
+
+    Example: city_names(cities, "numbeo_name") -> {"beit_shemesh": "Beit Shemesh", ...}
+    """
+    return {city.key: getattr(city, field) for city in cities}
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """
+    Parse a shard spec of the form "i/N" (1-based)
+
+    Returns:
+        (index, count)
+    """
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard {value!r}, expected i/N such as 1/4")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard {value!r}, index must be between 1 and {max(count, 1)}")
+    return index, count
+
+def shard_cities(cities: List[City], index: int, count: int) -> List[City]:
+    """
+    Cities assigned to one shard
+
+    Cities are dealt round-robin in registry order, so every shard gets a
+    similar number of cities and the split only depends on the registry.
+    """
+    return cities[index - 1::count]
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Cross-Source Listing Deduplication
+Finds the same apartment listed on Yad2 and Madlan with a blocking index
+on normalized addresses, so each listing is only compared with the few
+that could be the same one
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from records import Listing
+
+# Largest relative difference in price (and size, when both sides have it)
+# between two listings of the same apartment
+PRICE_TOLERANCE = 0.05
+SQM_TOLERANCE = 0.1
+
+# Largest difference in room count (sites differ on counting half rooms)
+ROOMS_TOLERANCE = 0.5
+
+# Street type prefixes that one site writes out and the other leaves off
+STREET_PREFIXES = ("רחוב", "רח", "שדרות", "שד", "דרך", "סמטת")
+
+# Quotes and geresh marks are written inconsistently (ז'בוטינסקי, ז׳בוטינסקי, זבוטינסקי),
+# and hyphens, dots and commas are only separators (בן-גוריון, בן גוריון)
+QUOTES_PATTERN = re.compile(r"[\"'`׳״]")
+SEPARATORS_PATTERN = re.compile(r"[.,\-/]")
+HOUSE_NUMBER_PATTERN = re.compile(r"\d+")
+
+def normalize_address(address: Optional[str]) -> Optional[str]:
+    """
+    Canonical form of a street address for matching
+
+    Example: "רח' ז'בוטינסקי  12א" -> "זבוטינסקי 12"
+
+    Returns:
+        "street number", or None if the address has no street and house number
+    """
+    if not address:
+        return None
+    words = SEPARATORS_PATTERN.sub(" ", QUOTES_PATTERN.sub("", address.lower())).split()
+    while words and words[0] in STREET_PREFIXES:
+        words = words[1:]
+
+    # The first number is the house number; entrance letters ("12א") are dropped
+    street, number = [], None
+    for word in words:
+        match = HOUSE_NUMBER_PATTERN.match(word)
+        if match is None:
+            street.append(word)
+        elif number is None:
+            number = match.group()
+    if number is None or not street:
+        return None
+    return f"{' '.join(street)} {number}"
+
+def _within(a: Optional[float], b: Optional[float], tolerance: float) -> bool:
+    """Relative closeness of two values; a missing value does not rule out a match"""
+    if not a or not b:
+        return True
+    return abs(a - b) <= tolerance * max(a, b)
+
+def is_match(a: Listing, b: Listing) -> bool:
+    """Check whether two listings describe the same apartment"""
+    if a.rooms and b.rooms and abs(a.rooms - b.rooms) > ROOMS_TOLERANCE:
+        return False
+    return _within(a.price, b.price, PRICE_TOLERANCE) and _within(a.sqm, b.sqm, SQM_TOLERANCE)
+
+class BlockingIndex:
+    def __init__(self, listings: List[Listing]):
+        """
+        Index of listings by normalized address
+
+        A lookup only returns listings at the same address (a building has
+        few listings), so matching n listings against m costs O(n + m)
+        plus a handful of comparisons per listing instead of n * m. Price
+        and room count alone are too common to block on without an
+        address, so listings without one are never treated as duplicates.
+        """
+        self.blocks: Dict[str, List[int]] = {}
+        for position, listing in enumerate(listings):
+            address = normalize_address(listing.address)
+            if address is not None:
+                self.blocks.setdefault(address, []).append(position)
+
+    def candidates(self, listing: Listing) -> List[int]:
+        """Positions of the indexed listings at the same address as this one"""
+        address = normalize_address(listing.address)
+        return self.blocks.get(address, []) if address is not None else []
+
+def find_duplicates(primary: List[Listing], secondary: List[Listing]) -> List[Tuple[int, int]]:
+    """
+    Pair up listings of two sources that describe the same apartment
+
+    Each listing is paired at most once; among several candidates the one
+    closest in price wins.
+
+    Returns:
+        (primary position, secondary position) for every duplicate
+    """
+    index = BlockingIndex(primary)
+    matched = set()
+    pairs = []
+    for position, listing in enumerate(secondary):
+        best = None
+        for candidate in index.candidates(listing):
+            if candidate in matched or not is_match(primary[candidate], listing):
+                continue
+            distance = abs((primary[candidate].price or 0) - (listing.price or 0))
+            if best is None or distance < best[0]:
+                best = (distance, candidate)
+        if best is not None:
+            matched.add(best[1])
+            pairs.append((best[1], position))
+    return pairs
+
+def merge_listings(primary: List[Listing], secondary: List[Listing]) -> Tuple[List[Listing], int]:
+    """
+    Union of two sources' listings with duplicates counted once
+
+    A primary listing matched with a secondary one keeps its own fields
+    and takes the ones it lacks (e.g. days on market) from its duplicate.
+
+    Returns:
+        (merged listings, number of duplicates removed)
+    """
+    pairs = find_duplicates(primary, secondary)
+    merged = [Listing(**listing.to_dict()) for listing in primary]
+    for primary_position, secondary_position in pairs:
+        listing, duplicate = merged[primary_position], secondary[secondary_position]
+        listing.update({
+            field: value for field, value in duplicate.to_dict().items()
+            if getattr(listing, field) is None and value is not None
+        })
+    duplicates = {secondary_position for _, secondary_position in pairs}
+    merged.extend(listing for position, listing in enumerate(secondary) if position not in duplicates)
+    return merged, len(pairs)
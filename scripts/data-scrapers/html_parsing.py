@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+HTML Parsing Helpers
+Shared BeautifulSoup helpers for the Yad2, Madlan and Numbeo scrapers
+"""
+
+import re
+from typing import Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401 - C parser, several times faster than html.parser
+    DEFAULT_PARSER = 'lxml'
+except ImportError:
+    DEFAULT_PARSER = 'html.parser'
+
+NUMBER_PATTERN = re.compile(r"-?\d[\d,]*(?:\.\d+)?")
+
+def make_soup(markup, parse_only: SoupStrainer = None, parser: str = None) -> BeautifulSoup:
+    """
+    Parse an HTML page
+
+    Args:
+        markup: Page body
+        parse_only: Strainer limiting the tree to the elements a scraper reads
+        parser: BeautifulSoup backend (defaults to lxml when installed)
+
+    Returns:
+        The parsed document
+    """
+    return BeautifulSoup(markup, parser or DEFAULT_PARSER, parse_only=parse_only)
+
+def parse_number(text: Optional[str]) -> Optional[float]:
+    """
+    Extract the first number from a text fragment
+
+    Handles values such as "₪ 2,150,000", "3.2%" or "45 days".
+
+    Returns:
+        The number as a float, or None if the text contains no number
+    """
+    if not text:
+        return None
+    match = NUMBER_PATTERN.search(text)
+    if not match:
+        return None
+    return float(match.group().replace(",", ""))
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+On-Disk HTTP Cache
+Stores response bodies with their validators so unchanged pages are
+revalidated with a conditional GET (304) instead of downloaded again
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+
+class HttpCache:
+    def __init__(self, cache_dir: str = "data/http_cache", ttl: float = 30 * 24 * 3600,
+                 max_bytes: int = 200 * 1024 * 1024):
+        """
+        Args:
+            cache_dir: Directory holding cached bodies and the index
+            ttl: Seconds after which an entry that has not been revalidated is dropped
+            max_bytes: Total body size kept on disk; least recently used entries go first
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.index_file = os.path.join(cache_dir, "index.json")
+        self.lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.entries = self._load_index()
+        self.hits = 0
+
+    def _load_index(self) -> Dict[str, Dict]:
+        """Load the cache index, starting empty if it is missing or corrupt"""
+        if not os.path.exists(self.index_file):
+            return {}
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            print(f"Warning: Ignoring unreadable cache index {self.index_file}")
+            return {}
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.body")
+
+    def validators(self, url: str) -> Dict[str, str]:
+        """
+        Conditional request headers for a cached URL
+
+        Returns:
+            If-None-Match / If-Modified-Since headers, or an empty dict on a cache miss
+        """
+        with self.lock:
+            entry = self.entries.get(self._key(url))
+            if entry is None or time.time() - entry["stored_at"] > self.ttl:
+                return {}
+
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def revalidated(self, url: str, response: requests.Response) -> Optional[requests.Response]:
+        """
+        Turn a 304 Not Modified into a full response built from the cached body
+
+        Returns:
+            A 200 response with the cached body, or None if the body is no longer cached
+        """
+        key = self._key(url)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            try:
+                with open(self._body_path(key), 'rb') as f:
+                    body = f.read()
+            except OSError:
+                del self.entries[key]
+                return None
+
+            now = time.time()
+            entry["stored_at"] = now
+            entry["accessed_at"] = now
+            self.hits += 1
+
+        cached = requests.Response()
+        cached.status_code = 200
+        cached.url = url
+        cached.headers.update(response.headers)
+        cached.headers["X-Cache"] = "HIT"
+        cached._content = body
+        return cached
+
+    def store(self, url: str, response: requests.Response):
+        """Cache a 200 response that carries an ETag or Last-Modified validator"""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code != 200 or not (etag or last_modified):
+            return
+
+        key = self._key(url)
+        body = response.content
+        with self.lock:
+            with open(self._body_path(key), 'wb') as f:
+                f.write(body)
+            now = time.time()
+            self.entries[key] = {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "size": len(body),
+                "stored_at": now,
+                "accessed_at": now
+            }
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under max_bytes"""
+        with self.lock:
+            now = time.time()
+            expired = [key for key, entry in self.entries.items() if now - entry["stored_at"] > self.ttl]
+            for key in expired:
+                self._remove(key)
+
+            total = sum(entry["size"] for entry in self.entries.values())
+            for key in sorted(self.entries, key=lambda k: self.entries[k]["accessed_at"]):
+                if total <= self.max_bytes:
+                    break
+                total -= self.entries[key]["size"]
+                self._remove(key)
+
+    def _remove(self, key: str):
+        del self.entries[key]
+        try:
+            os.remove(self._body_path(key))
+        except OSError:
+            pass
+
+    def save(self):
+        """Apply eviction and write the index to disk"""
+        self.evict()
+        with self.lock:
+            tmp_file = self.index_file + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_file, self.index_file)
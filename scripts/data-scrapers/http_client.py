@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP Client
+Pooled, rate-limited fetch layer used by the Yad2, Madlan and Numbeo scrapers
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import HttpCache
+from rate_limiter import RateLimiter, host_of
+from resilience import RETRY_STATUSES, CircuitBreaker, CircuitOpenError, RetryPolicy
+
+try:
+    import brotli  # noqa: F401 - lets urllib3 decode br responses
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Encoding': ACCEPT_ENCODING
+}
+
+# Default for a scraper's pre-fetched page argument when no batch fetch was
+# done; None instead means the page was requested and the fetch failed
+NOT_FETCHED = object()
+
+class HttpClient:
+    def __init__(self, rate_limiter: RateLimiter = None, max_per_host: int = 4,
+                 max_workers: int = 16, timeout: float = 30, cache: HttpCache = None,
+                 retry: RetryPolicy = None, failure_threshold: int = 5, reset_timeout: float = 120):
+        """
+        Shared HTTP client with keep-alive pooling and bounded per-host concurrency
+
+        Args:
+            rate_limiter: Per-host rate limiter (a private one is created if omitted)
+            max_per_host: Maximum requests in flight to a single host
+            max_workers: Maximum requests in flight across all hosts
+            timeout: Request timeout in seconds
+            cache: On-disk cache used for conditional GETs (disabled if omitted)
+            retry: Backoff policy for 429/5xx responses and connection errors
+            failure_threshold: Consecutive failures after which a host's circuit opens
+            reset_timeout: Seconds an open circuit rejects requests before a trial one
+        """
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.cache = cache
+        self.retry = retry or RetryPolicy()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+
+        # One session for all scrapers so connections are reused across them.
+        # The pool keeps up to max_per_host keep-alive connections per host.
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=max_per_host)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="http")
+        self.host_slots = {}
+        self.breakers = {}
+        self.host_stats = {}
+        self.lock = threading.Lock()
+
+    def _host_slot(self, host: str) -> threading.BoundedSemaphore:
+        """Get the semaphore bounding concurrent requests to a host"""
+        with self.lock:
+            if host not in self.host_slots:
+                self.host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self.host_slots[host]
+
+    def _count(self, host: str, **increments):
+        """Add to a host's request counters"""
+        with self.lock:
+            stats = self.host_stats.setdefault(host, {
+                "requests": 0, "bytes": 0, "cache_hits": 0, "retries": 0,
+                "errors": 0, "circuit_rejections": 0, "rate_limited_s": 0.0
+            })
+            for name, value in increments.items():
+                stats[name] += value
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Request counters per host, plus a "total" entry
+
+        Counts requests sent, bytes downloaded, 304s served from the cache,
+        retries, failed requests, requests refused by an open circuit and
+        seconds spent waiting on the rate limiter.
+        """
+        with self.lock:
+            hosts = {host: dict(stats) for host, stats in self.host_stats.items()}
+        total = {}
+        for stats in hosts.values():
+            for name, value in stats.items():
+                total[name] = total.get(name, 0) + value
+        for stats in list(hosts.values()) + [total]:
+            if "rate_limited_s" in stats:
+                stats["rate_limited_s"] = round(stats["rate_limited_s"], 3)
+        return dict(hosts, total=total)
+
+    def throttle(self, url_or_host: str) -> float:
+        """
+        Wait for a request slot on a host without sending a request
+
+        Used by the scrapers' estimate mode so it paces itself like a live
+        run; the wait is counted in the host's rate_limited_s.
+        """
+        host = host_of(url_or_host)
+        waited = self.rate_limiter.acquire(host)
+        self._count(host, rate_limited_s=waited)
+        return waited
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        """Get (or create) the circuit breaker for a host"""
+        with self.lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self.breakers[host]
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        Fetch a URL, blocking until a rate-limit slot and a connection are free
+
+        429/5xx responses and connection errors are retried with jittered
+        exponential backoff. Retry-After blocks the whole host through the
+        rate limiter, so the retry (and every other request to that host)
+        waits at least that long.
+
+        Args:
+            url: URL to fetch
+            **kwargs: Extra arguments passed to requests.Session.get
+
+        Returns:
+            The HTTP response (the last one if every attempt failed)
+
+        Raises:
+            CircuitOpenError: The host has failed repeatedly and is not being contacted
+            requests.RequestException: The last attempt failed without a response
+        """
+        host = host_of(url)
+        breaker = self.breaker(host)
+        kwargs.setdefault("timeout", self.timeout)
+
+        headers = kwargs.get("headers")
+        validators = self.cache.validators(url) if self.cache is not None else {}
+        if validators:
+            # Revisit cached pages with a conditional GET
+            kwargs["headers"] = dict(headers or {}, **validators)
+
+        for attempt in range(1, self.retry.max_attempts + 1):
+            if not breaker.allow():
+                self._count(host, circuit_rejections=1)
+                raise CircuitOpenError(f"Circuit open for {host}, skipping {url}")
+
+            error = response = None
+            waited = 0.0
+            try:
+                with self._host_slot(host):
+                    waited = self.rate_limiter.acquire(host)
+                    response = self.session.get(url, **kwargs)
+                self._count(host, requests=1, bytes=len(response.content), rate_limited_s=waited)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._count(host, requests=1, rate_limited_s=waited)
+                error = e
+            except requests.RequestException:
+                # Not worth retrying, but it still counts against the host, and a
+                # half-open breaker must not be left waiting on this trial request
+                self._count(host, requests=1, errors=1, rate_limited_s=waited)
+                if breaker.record_failure():
+                    print(f"Circuit opened for {host} after {breaker.failures} consecutive failures")
+                raise
+
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                breaker.record_success()
+                break
+
+            self._count(host, errors=1)
+            if breaker.record_failure():
+                print(f"Circuit opened for {host} after {breaker.failures} consecutive failures")
+            reason = str(error) if error is not None else f"HTTP {response.status_code}"
+
+            retry_after = None
+            if response is not None and response.status_code in (429, 503):
+                retry_after = self.rate_limiter.retry_after(host, response.headers.get("Retry-After"))
+            if (retry_after or 0) > self.retry.max_delay:
+                # Not worth waiting for: stop contacting the host until it is back
+                print(f"Circuit opened for {host}: Retry-After {retry_after:.0f}s")
+                breaker.trip(retry_after)
+
+            if attempt == self.retry.max_attempts or breaker.state == "open":
+                if error is not None:
+                    raise error
+                break
+
+            delay = self.retry.backoff(attempt)
+            print(f"Retrying {url} in {max(delay, retry_after or 0):.1f}s ({reason}, attempt {attempt}/{self.retry.max_attempts})")
+            self._count(host, retries=1)
+            time.sleep(delay)
+
+        if self.cache is not None:
+            if response.status_code == 304:
+                cached = self.cache.revalidated(url, response)
+                if cached is not None:
+                    self._count(host, cache_hits=1)
+                    response = cached
+                elif validators:
+                    # The body behind the validators is gone (its index entry is
+                    # dropped now), so ask again for the full page
+                    print(f"Cached body of {url} is missing, fetching it again")
+                    return self.get(url, **dict(kwargs, headers=headers))
+            else:
+                self.cache.store(url, response)
+
+        return response
+
+    async def fetch(self, url: str, **kwargs) -> requests.Response:
+        """Fetch a URL without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: self.get(url, **kwargs))
+
+    async def fetch_all(self, urls: List[str]) -> Dict[str, Optional[requests.Response]]:
+        """
+        Fetch many URLs concurrently
+
+        Returns:
+            Mapping of URL to response, or None for URLs that failed
+        """
+        responses = await asyncio.gather(*(self.fetch(url) for url in urls), return_exceptions=True)
+
+        results = {}
+        for url, response in zip(urls, responses):
+            if isinstance(response, Exception):
+                print(f"Error fetching {url}: {str(response)}")
+                response = None
+            results[url] = response
+        return results
+
+    def fetch_many(self, urls: List[str]) -> Dict[str, Optional[requests.Response]]:
+        """Blocking wrapper around fetch_all for synchronous callers"""
+        return asyncio.run(self.fetch_all(urls))
+
+    def fetch_bodies(self, urls: List[str]) -> Dict[str, Optional[bytes]]:
+        """
+        Fetch many URLs concurrently and return their bodies
+
+        Returns:
+            Mapping of URL to response body, or None for failed and non-2xx responses
+        """
+        bodies = {}
+        for url, response in self.fetch_many(urls).items():
+            if response is not None and not response.ok:
+                print(f"Error fetching {url}: HTTP {response.status_code}")
+                response = None
+            bodies[url] = response.content if response is not None else None
+        return bodies
+
+    def close(self):
+        """Release pooled connections and worker threads, and persist the cache"""
+        self.executor.shutdown(wait=True)
+        self.session.close()
+        if self.cache is not None:
+            self.cache.save()
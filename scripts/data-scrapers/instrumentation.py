@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Run Instrumentation
+Timings per stage, source and city, collected into a JSON run report
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator
+
+class Instrumentation:
+    def __init__(self):
+        """
+        Thread-safe recorder of stage timings
+
+        Timings are grouped by scope (a source name, or "run" for the
+        whole run) and stage ("fetch", "parse", "aggregate", ...), with
+        an optional per-city breakdown.
+        """
+        self.started = datetime.now()
+        self.started_clock = time.perf_counter()
+        self.timings: Dict[str, Dict[str, Dict]] = {}
+        self.lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float, scope: str = "run", city: str = None):
+        """Add one measured duration"""
+        with self.lock:
+            timing = self.timings.setdefault(scope, {}).setdefault(
+                stage, {"total_s": 0.0, "calls": 0, "cities": {}}
+            )
+            timing["total_s"] += seconds
+            timing["calls"] += 1
+            if city is not None:
+                timing["cities"][city] = timing["cities"].get(city, 0.0) + seconds
+
+    @contextmanager
+    def timed(self, stage: str, scope: str = "run", city: str = None) -> Iterator[None]:
+        """Time the enclosed block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, scope, city)
+
+    def report(self, **sections) -> Dict:
+        """
+        Build the run report
+
+        Args:
+            **sections: Extra top-level sections (options, HTTP counters, ...)
+
+        Returns:
+            JSON-serializable report with all timings rounded to milliseconds
+        """
+        with self.lock:
+            timings = {
+                scope: {
+                    stage: {
+                        "total_s": round(timing["total_s"], 3),
+                        "calls": timing["calls"],
+                        "cities": {city: round(seconds, 3) for city, seconds in timing["cities"].items()}
+                    }
+                    for stage, timing in stages.items()
+                }
+                for scope, stages in self.timings.items()
+            }
+
+        report = {
+            "started": self.started.isoformat(),
+            "duration_s": round(time.perf_counter() - self.started_clock, 3),
+            "timings": timings
+        }
+        report.update(sections)
+        return report
+
+    def save(self, path: str, **sections) -> Dict:
+        """Write the run report to a JSON file"""
+        report = self.report(**sections)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return report
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Listing Statistics
+Reductions used to turn scraped listings into per-city metrics
+"""
+
+import random
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from records import Listing
+
+# Listing fields loaded into arrays, in column order
+FIELDS = ("price", "sqm", "rooms", "days_on_market")
+
+# One row per listing; missing fields are stored as NaN
+LISTING_DTYPE = np.dtype([(field, float) for field in FIELDS])
+
+# Modified z-score above which a value is treated as an outlier
+OUTLIER_Z = 3.5
+
+# Floor on the spread (as a fraction of the median) used for the z-score, so
+# tightly clustered prices do not turn ordinary listings into outliers
+MIN_RELATIVE_SPREAD = 0.05
+
+# Values a RobustMean keeps; up to this many listings its mean is exact
+RESERVOIR_SIZE = 10000
+
+class RobustMean:
+    def __init__(self, capacity: int = RESERVOIR_SIZE):
+        """
+        Outlier-rejecting mean of a stream of values, kept in bounded memory
+
+        The values go into a fixed-size reservoir sample, and the mean is
+        taken over its inliers exactly as ListingStats.robust_mean does for
+        a batch. Up to capacity values the result equals the batch figure;
+        past it, it is the same statistic on a uniform sample. The sample
+        is seeded, so a rerun on the same data gives the same figure.
+        """
+        self.capacity = capacity
+        self.count = 0
+        self.reservoir = np.empty(capacity)
+        self.random = random.Random(0)
+
+    def add(self, value: float):
+        """Offer one value to the reservoir"""
+        self.count += 1
+        if self.count <= self.capacity:
+            self.reservoir[self.count - 1] = value
+        else:
+            slot = self.random.randrange(self.count)
+            if slot < self.capacity:
+                self.reservoir[slot] = value
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Mean of the values after outlier rejection, or None if no value was added"""
+        return summarize(self.reservoir[:min(self.count, self.capacity)]).get("mean")
+
+def inliers(values: np.ndarray) -> np.ndarray:
+    """
+    Mask of values that are not outliers
+
+    Uses the modified z-score (distance from the median in units of the
+    median absolute deviation), so a single mispriced listing cannot
+    drag the threshold along with it the way a mean/stddev test would.
+    """
+    if len(values) < 3:
+        return np.ones(len(values), dtype=bool)
+    median = np.median(values)
+    mad = max(np.median(np.abs(values - median)), abs(median) * MIN_RELATIVE_SPREAD)
+    if mad == 0:
+        return np.ones(len(values), dtype=bool)
+    return 0.6745 * np.abs(values - median) / mad <= OUTLIER_Z
+
+def summarize(values: np.ndarray, trim: float = 0.1, reject_outliers: bool = True) -> Dict:
+    """
+    Summary statistics of one array of values
+
+    Args:
+        values: Values to summarize (NaN entries are ignored)
+        trim: Fraction cut from each end for the trimmed mean
+        reject_outliers: Drop outliers before computing the statistics
+
+    Returns:
+        Dictionary with count, outliers, mean, median, trimmed_mean, p10, p50 and p90
+    """
+    values = values[~np.isnan(values)]
+    kept = values[inliers(values)] if reject_outliers else values
+    if not len(kept):
+        return {"count": 0, "outliers": int(len(values))}
+
+    # One sort serves the median, the percentiles and the trimmed mean
+    ordered = np.sort(kept)
+    p10, p50, p90 = np.percentile(ordered, [10, 50, 90])
+    cut = int(len(ordered) * trim)
+    trimmed = ordered[cut:len(ordered) - cut] if len(ordered) > 2 * cut else ordered
+
+    return {
+        "count": int(len(kept)),
+        "outliers": int(len(values) - len(kept)),
+        "mean": float(ordered.mean()),
+        "median": float(p50),
+        "trimmed_mean": float(trimmed.mean()),
+        "p10": float(p10),
+        "p50": float(p50),
+        "p90": float(p90)
+    }
+
+class ListingStats:
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        """
+        Array-backed view of a batch of listings
+
+        Args:
+            columns: One float array per field in FIELDS, NaN where a listing lacks the field
+        """
+        self.columns = columns
+
+    @classmethod
+    def from_listings(cls, listings: Iterable[Listing]) -> "ListingStats":
+        """
+        Load the listing fields into NumPy arrays
+
+        Listings are consumed one at a time straight into a packed array,
+        so a generator of listings is never materialized as a list.
+        """
+        rows = (
+            tuple(np.nan if value is None else value for value in (getattr(listing, field) for field in FIELDS))
+            for listing in listings
+        )
+        table = np.fromiter(rows, dtype=LISTING_DTYPE)
+        return cls({field: table[field] for field in FIELDS})
+
+    def __len__(self) -> int:
+        return len(self.columns["price"])
+
+    def price_per_sqm(self) -> np.ndarray:
+        """Price per square meter for every listing (NaN without a size)"""
+        sqm = self.columns["sqm"]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(sqm > 0, self.columns["price"] / sqm, np.nan)
+
+    def summary(self, field: str, **kwargs) -> Dict:
+        """Summary statistics of one field (or "price_per_sqm")"""
+        values = self.price_per_sqm() if field == "price_per_sqm" else self.columns[field]
+        return summarize(values, **kwargs)
+
+    def by_rooms(self, field: str, **kwargs) -> Dict[float, Dict]:
+        """
+        Summary statistics of one field for each room count
+
+        Listings are sorted by room count once and each group is a
+        contiguous slice of the sorted arrays.
+        """
+        values = self.price_per_sqm() if field == "price_per_sqm" else self.columns[field]
+        rooms = self.columns["rooms"]
+        known = ~np.isnan(rooms)
+        rooms, values = rooms[known], values[known]
+
+        order = np.argsort(rooms, kind="stable")
+        rooms, values = rooms[order], values[order]
+        room_counts, starts = np.unique(rooms, return_index=True)
+        ends = np.append(starts[1:], len(rooms))
+
+        return {
+            float(count): summarize(values[start:end], **kwargs)
+            for count, start, end in zip(room_counts, starts, ends)
+        }
+
+    def robust_mean(self, field: str, rooms: float = None) -> Optional[float]:
+        """
+        Mean of a field after outlier rejection, optionally for one room count
+
+        Returns:
+            The mean, or None if no listing has the field
+        """
+        if rooms is not None:
+            stats = self.by_rooms(field).get(float(rooms), {})
+        else:
+            stats = self.summary(field)
+        return stats.get("mean")
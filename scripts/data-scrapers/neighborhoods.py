@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Neighborhood Rollup
+City-level neighborhood scores as listing-weighted averages of the
+per-neighborhood scores, computed for every city in one vectorized pass
+"""
+
+from typing import Dict, List
+
+import numpy as np
+
+from records import Neighborhood
+
+# Score categories, in neighborhood_scores order
+SCORE_FIELDS = ("schools", "transportation", "amenities", "safety")
+
+def load(neighborhoods: Dict[str, List[Neighborhood]]):
+    """
+    Load the neighborhoods of all cities into one matrix
+
+    Args:
+        neighborhoods: Neighborhoods of each city
+
+    Returns:
+        (cities, starts, weights, scores): the cities that have neighborhoods,
+        the row where each city's block starts, one weight per row (its
+        listings count, 1 when unknown) and a (rows x SCORE_FIELDS) matrix
+        with NaN where a neighborhood lacks a score
+    """
+    cities = [city for city, rows in neighborhoods.items() if rows]
+    rows = [row for city in cities for row in neighborhoods[city]]
+    starts = np.cumsum([0] + [len(neighborhoods[city]) for city in cities[:-1]])
+
+    weights = np.fromiter(
+        (row.listings_count if row.listings_count else 1 for row in rows), dtype=float, count=len(rows)
+    )
+    scores = np.array(
+        [[(row.scores or {}).get(field, np.nan) for field in SCORE_FIELDS] for row in rows],
+        dtype=float
+    ).reshape(len(rows), len(SCORE_FIELDS))
+    return cities, starts, weights, scores
+
+def rollup(neighborhoods: Dict[str, List[Neighborhood]]) -> Dict[str, Dict[str, float]]:
+    """
+    Roll neighborhood scores up to their cities
+
+    Each city score is the average of its neighborhoods' scores weighted
+    by their listings count, ignoring neighborhoods without that score.
+    The rows of all cities sit in one matrix grouped by city, so a single
+    reduceat sums every score of every city at once instead of looping
+    over each city's neighborhoods.
+
+    Returns:
+        neighborhood_scores per city; scores no neighborhood has are left out
+    """
+    cities, starts, weights, scores = load(neighborhoods)
+    if not cities:
+        return {}
+
+    known = ~np.isnan(scores)
+    totals = np.add.reduceat(np.where(known, scores, 0.0) * weights[:, None], starts, axis=0)
+    weight_totals = np.add.reduceat(known * weights[:, None], starts, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = np.round(totals / weight_totals, 1)
+
+    return {
+        city: {field: float(value) for field, value in zip(SCORE_FIELDS, row) if not np.isnan(value)}
+        for city, row in zip(cities, means)
+    }
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Output Writer
+Serializes community data for the frontend: readable JSON for review, or
+minified JSON with precompressed siblings for static hosting, either as
+one file or split per city with an index manifest
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from typing import Dict, List
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Split output: index manifest and per-city files, relative to the output directory
+INDEX_FILE = "index.json"
+CITIES_DIR = "cities"
+
+# Metrics copied into the index so list views do not need the city files
+HEADLINE_METRICS = (
+    "property_data.avg_price_per_sqm",
+    "property_data.avg_rent_3br",
+    "market_analytics.market_index",
+    "cost_of_living.total_monthly",
+    "cost_of_living.cost_index"
+)
+
+def compact_community_data(community_data: Dict) -> Dict:
+    """
+    Drop metadata the production payload does not need
+
+    Every city block repeats the data_sources list that is already at the
+    top level; the top-level list is kept.
+    """
+    return dict(community_data, cities=[
+        {key: value for key, value in city_data.items() if key != "data_sources"}
+        for city_data in community_data["cities"]
+    ])
+
+def serialize(content: Dict, minify: bool = False, sort_keys: bool = False) -> bytes:
+    """
+    Encode a document as UTF-8 JSON, indented or minified
+
+    With sort_keys the bytes only depend on the content, not on the order
+    the blocks were assembled in.
+    """
+    if minify:
+        text = json.dumps(content, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys)
+    else:
+        text = json.dumps(content, ensure_ascii=False, indent=2, sort_keys=sort_keys)
+    return text.encode('utf-8')
+
+def write_file(path: str, payload: bytes):
+    """Write a file atomically, so the frontend never sees a partial file"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_file = path + ".tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_file, path)
+
+def write_precompressed(path: str, payload: bytes) -> List[str]:
+    """
+    Write .gz and (if brotli is installed) .br siblings of an output file
+
+    Static hosts can serve these directly instead of compressing the file
+    on every request. The gzip header carries no timestamp, so unchanged
+    payloads compress to identical bytes.
+
+    Returns:
+        Paths of the files written
+    """
+    written = [path + ".gz"]
+    write_file(written[0], gzip.compress(payload, compresslevel=9, mtime=0))
+    if brotli is not None:
+        written.append(path + ".br")
+        write_file(written[1], brotli.compress(payload, quality=11))
+    else:
+        stale = path + ".br"
+        if os.path.exists(stale):
+            os.remove(stale)
+    return written
+
+def content_hash(payload: bytes) -> str:
+    """Short content hash of a serialized file, for cache keys"""
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+def headline_metrics(city_data: Dict) -> Dict:
+    """Pick the headline metrics of a city block for the index"""
+    headline = {}
+    for path in HEADLINE_METRICS:
+        value = city_data
+        for key in path.split("."):
+            value = value.get(key) if isinstance(value, dict) else None
+        headline[path.rsplit(".", 1)[1]] = value
+    return headline
+
+def write_split(output_dir: str, community_data: Dict, names: Dict[str, Dict[str, str]],
+                minify: bool = False, precompress: bool = False, sort_keys: bool = False,
+                hashed: bool = False) -> Dict:
+    """
+    Write one file per city plus an index.json manifest
+
+    A page showing one city only fetches the small index and that city's
+    file, and can cache the file by its hash. With hashed, the hash is also
+    part of each city's file name, so a city file never changes once
+    written and can be cached indefinitely; only index.json has to be
+    revalidated. Files no longer listed in the index are removed.
+
+    Args:
+        output_dir: Directory for index.json; city files go to its cities/ subdirectory
+        community_data: Document as written to community_data.json
+        names: Display names per city key, e.g. {"modiin": {"name": "Modiin", "name_hebrew": "מודיעין"}}
+        minify: Minify the files
+        precompress: Also write .gz/.br siblings
+        sort_keys: Serialize with sorted keys
+        hashed: Name city files <city>.<hash>.json instead of <city>.json
+
+    Returns:
+        The index document
+    """
+    cities_dir = os.path.join(output_dir, CITIES_DIR)
+    index = {
+        "last_updated": community_data["last_updated"],
+        "data_sources": community_data["data_sources"],
+        "cities": []
+    }
+
+    written = set()
+    for city_data in community_data["cities"]:
+        city = city_data["city"]
+        payload = serialize(city_data, minify=minify, sort_keys=sort_keys)
+        digest = content_hash(payload)
+        file_name = f"{city}.{digest}.json" if hashed else f"{city}.json"
+        write_file(os.path.join(cities_dir, file_name), payload)
+        if precompress:
+            write_precompressed(os.path.join(cities_dir, file_name), payload)
+        written.add(file_name)
+
+        entry = {"city": city}
+        entry.update(names.get(city, {}))
+        entry.update({
+            "file": f"{CITIES_DIR}/{file_name}",
+            "hash": digest,
+            "bytes": len(payload),
+            "last_updated": city_data["last_updated"],
+            "headline": headline_metrics(city_data)
+        })
+        index["cities"].append(entry)
+
+    # Cities dropped from the output, and old versions of hashed files, must not linger
+    for file_name in os.listdir(cities_dir) if os.path.isdir(cities_dir) else []:
+        if file_name.split(".json", 1)[0] + ".json" not in written:
+            os.remove(os.path.join(cities_dir, file_name))
+
+    index_file = os.path.join(output_dir, INDEX_FILE)
+    payload = serialize(index, minify=minify, sort_keys=sort_keys)
+    write_file(index_file, payload)
+    if precompress:
+        write_precompressed(index_file, payload)
+    return index
+
+def without_timestamps(city_data: Dict) -> Dict:
+    """A city block minus the metadata that does not count as a data change"""
+    return {key: value for key, value in city_data.items() if key not in ("last_updated", "data_sources")}
+
+def keep_timestamps(community_data: Dict, previous_output: Dict) -> int:
+    """
+    Carry last_updated over from the previous output where nothing changed
+
+    A city block whose content equals its previous version keeps the
+    previous last_updated, and if every city and the source list are
+    unchanged, so does the document. Unchanged data then serializes to
+    identical bytes from run to run.
+
+    Returns:
+        Number of cities whose timestamp was kept
+    """
+    previous_cities = {city_data["city"]: city_data for city_data in previous_output["cities"]}
+    kept = 0
+    for city_data in community_data["cities"]:
+        previous = previous_cities.get(city_data["city"])
+        if previous is not None and without_timestamps(previous) == without_timestamps(city_data):
+            city_data["last_updated"] = previous["last_updated"]
+            kept += 1
+
+    if (kept == len(community_data["cities"]) == len(previous_cities)
+            and community_data["data_sources"] == previous_output["data_sources"]):
+        community_data["last_updated"] = previous_output["last_updated"]
+    return kept
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Fetch/Parse Pipeline
+Live-mode collection split into stages: fetcher threads download raw
+pages, a process pool parses them into records, and the results are
+gathered per source for the aggregator
+"""
+
+import multiprocessing
+import multiprocessing.util
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import scrape_madlan
+import scrape_numbeo
+import scrape_yad2
+from http_client import HttpClient
+from records import MadlanRecord, NumbeoRecord, SourceRecord, Yad2Record
+
+# Per source: the scraper method that parses one city's pages and the record it returns
+SOURCES = {
+    "yad2": ("scrape_city_data", Yad2Record),
+    "madlan": ("scrape_city_analytics", MadlanRecord),
+    "numbeo": ("scrape_city_cost_of_living", NumbeoRecord)
+}
+
+# Marks the end of the fetch queue
+DONE = None
+
+# Scrapers of a parser worker process, created once per process
+_worker_scrapers = None
+
+def _init_worker():
+    """Create the scrapers a parser process uses (they never touch the network)"""
+    global _worker_scrapers
+    client = HttpClient(max_workers=1)
+    # Release the session and its thread when the pool shuts the process down
+    multiprocessing.util.Finalize(client, client.close, exitpriority=10)
+    _worker_scrapers = {
+        "yad2": scrape_yad2.Yad2Scraper(client=client, live=True),
+        "madlan": scrape_madlan.MadlanScraper(client=client, live=True),
+        "numbeo": scrape_numbeo.NumbeoScraper(client=client, live=True)
+    }
+
+def parse_city(source: str, city: str, local_name: str, pages) -> Tuple[Optional[SourceRecord], float]:
+    """
+    Turn one city's raw pages into a record (runs in a parser process)
+
+    Returns:
+        (record, seconds spent parsing)
+    """
+    start = time.perf_counter()
+    record = getattr(_worker_scrapers[source], SOURCES[source][0])(city, local_name, pages)
+    return record, time.perf_counter() - start
+
+class ParsePipeline:
+    def __init__(self, scrapers: Dict, workers: int = None, fetchers: int = 8):
+        """
+        Args:
+            scrapers: Live-mode scraper per source name, used for fetching
+            workers: Parser processes (defaults to the number of CPUs)
+            fetchers: Threads fetching city pages; each one blocks on the
+                shared client's per-host limits, not on parsing
+        """
+        self.scrapers = scrapers
+        self.workers = workers or os.cpu_count() or 1
+        self.fetchers = fetchers
+        self.pages = queue.Queue(maxsize=2 * self.workers)
+        self.done = {source: {} for source in SOURCES}
+
+    def _fetch(self, source: str, city: str, local_name: str):
+        """Fetch one city's pages and queue them for parsing"""
+        with self.scrapers[source].instrumentation.timed("fetch", source, city):
+            pages = self.scrapers[source].fetch_city_pages({city: local_name})[city]
+        # A failed fetch is passed on as None, which the parser does not refetch
+        self.pages.put((source, city, local_name, pages))
+
+    def _fetch_all(self):
+        """Fetch stage: download every city of every source, then signal the end"""
+        try:
+            with ThreadPoolExecutor(max_workers=self.fetchers, thread_name_prefix="fetch") as fetchers:
+                for source in SOURCES:
+                    for city, local_name in self.scrapers[source].cities.items():
+                        if city not in self.done[source]:
+                            fetchers.submit(self._fetch, source, city, local_name)
+        finally:
+            self.pages.put(DONE)
+
+    def _parsed(self, source: str, city: str, future: Future):
+        """Gather stage: keep (and checkpoint) a city's record as soon as it is parsed"""
+        try:
+            record, seconds = future.result()
+        except Exception as e:
+            print(f"Error parsing {source} pages for {city}: {str(e)}")
+            return
+        self.scrapers[source].instrumentation.record("parse", seconds, source, city)
+        if record is None:
+            return
+        self.done[source][city] = record
+        checkpoints = self.scrapers[source].checkpoints
+        if checkpoints is not None:
+            checkpoints.save(source, record)
+
+    def run(self) -> Dict[str, List[SourceRecord]]:
+        """
+        Run the fetch, parse and gather stages concurrently
+
+        Parsing starts as soon as the first page arrives. At most two pages
+        per worker wait for a parser; beyond that the queue fills up and
+        the fetchers wait, so raw pages never pile up in memory.
+
+        Returns:
+            Records per source, in the order of each scraper's cities
+        """
+        # Cities checkpointed by an interrupted run are neither fetched nor parsed
+        for source, (_, record_type) in SOURCES.items():
+            checkpoints = self.scrapers[source].checkpoints
+            if checkpoints is not None:
+                self.done[source] = checkpoints.completed(source, record_type, self.scrapers[source].cities)
+        
+        context = multiprocessing.get_context("spawn")
+        in_flight = threading.BoundedSemaphore(2 * self.workers)
+
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                 initializer=_init_worker) as parsers:
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="fetch-stage") as fetch_stage:
+                fetching = fetch_stage.submit(self._fetch_all)
+                while True:
+                    job = self.pages.get()
+                    if job is DONE:
+                        break
+                    source, city = job[0], job[1]
+                    in_flight.acquire()
+                    future = parsers.submit(parse_city, *job)
+                    future.add_done_callback(lambda f, source=source, city=city: self._parsed(source, city, f))
+                    future.add_done_callback(lambda _: in_flight.release())
+                fetching.result()
+            # Leaving the pool waits for the remaining parses and their callbacks
+
+        results = {
+            source: [self.done[source][city] for city in self.scrapers[source].cities if city in self.done[source]]
+            for source in SOURCES
+        }
+
+        if self.scrapers["yad2"].trend_engine is not None:
+            self.scrapers["yad2"].apply_price_trends(results["yad2"])
+        self.scrapers["madlan"].apply_neighborhood_rollup(results["madlan"])
+
+        return results
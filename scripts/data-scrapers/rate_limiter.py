@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Per-Host Rate Limiter
+Token bucket rate limiting shared by the Yad2, Madlan and Numbeo scrapers
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+# Requests per second and burst size tolerated by each host
+HOST_LIMITS = {
+    "www.yad2.co.il": {"rate": 0.5, "burst": 2},
+    "www.madlan.co.il": {"rate": 0.5, "burst": 2},
+    "www.numbeo.com": {"rate": 1.0, "burst": 3}
+}
+
+# Conservative limit for hosts without an explicit entry
+DEFAULT_LIMIT = {"rate": 0.5, "burst": 1}
+
+def host_of(url_or_host: str) -> str:
+    """Return the host part of a URL, or the value itself if it is already a host"""
+    if "://" in url_or_host:
+        return urlparse(url_or_host).netloc
+    return url_or_host
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header value
+
+    Args:
+        value: Header value, either delay-seconds or an HTTP date
+
+    Returns:
+        Number of seconds to wait, or None if the value is missing or invalid
+    """
+    if not value:
+        return None
+
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        """
+        Token bucket for a single host
+
+        Args:
+            rate: Tokens added per second (sustained requests/sec)
+            burst: Maximum number of tokens the bucket can hold
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        """Add the tokens earned since the last update"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """
+        Reserve one token and return how long the caller must wait for it
+
+        The token is taken immediately (the balance may go negative), so
+        concurrent callers queue up behind each other instead of racing.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+
+            wait = 0.0
+            if self.tokens < 0:
+                wait = -self.tokens / self.rate
+            return max(wait, self.blocked_until - now)
+
+    def block_for(self, seconds: float):
+        """Hold all requests to this host for the given number of seconds"""
+        with self.lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            # Drain the bucket so requests do not burst as soon as the block ends
+            self._refill(now)
+            self.tokens = min(self.tokens, 0.0)
+
+class RateLimiter:
+    def __init__(self, limits: Dict[str, Dict] = None):
+        """
+        Registry of token buckets, one per host
+
+        Args:
+            limits: Per-host {"rate": ..., "burst": ...} overrides on top of HOST_LIMITS
+        """
+        self.limits = dict(HOST_LIMITS)
+        if limits:
+            self.limits.update(limits)
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url_or_host: str) -> TokenBucket:
+        """Get (or create) the token bucket for a host"""
+        host = host_of(url_or_host)
+        with self.lock:
+            if host not in self.buckets:
+                limit = self.limits.get(host, DEFAULT_LIMIT)
+                self.buckets[host] = TokenBucket(limit["rate"], limit["burst"])
+            return self.buckets[host]
+
+    def acquire(self, url_or_host: str) -> float:
+        """
+        Block until a request to this host is allowed
+
+        Returns:
+            Number of seconds spent waiting
+        """
+        wait = self.bucket(url_or_host).reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def retry_after(self, url_or_host: str, value: Optional[str]) -> Optional[float]:
+        """
+        Honor a Retry-After header returned by a host
+
+        Args:
+            url_or_host: URL or host that returned the header
+            value: Raw Retry-After header value
+
+        Returns:
+            Number of seconds the host is blocked for, or None if the value was invalid
+        """
+        delay = parse_retry_after(value)
+        if delay is not None:
+            self.bucket(url_or_host).block_for(delay)
+        return delay
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Scraped Records
+Compact, slot-based records passed between the scrapers and the aggregator
+"""
+
+from typing import Dict, Tuple
+
+class Record:
+    """
+    Fixed set of fields stored in __slots__ instead of a per-instance dict
+
+    Fields are serialized in slot order, so to_dict() produces the same
+    JSON the scrapers used to build by hand. A field listed in NESTED may
+    also hold a list of records. Fields listed in TRANSIENT are left out
+    of to_dict() unless asked for, so they never reach the JSON output.
+    """
+    __slots__ = ()
+
+    # Fields that hold a nested record (or a list of them), mapped to its class
+    NESTED: Dict[str, type] = {}
+
+    # Fields only serialized on request (checkpoints), never into the JSON output
+    TRANSIENT: Tuple[str, ...] = ()
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.pop(name, None))
+        if fields:
+            raise TypeError(f"Unknown {type(self).__name__} fields: {', '.join(fields)}")
+
+    def to_dict(self, transient: bool = False) -> Dict:
+        """Plain dictionary of the fields, with nested records expanded (and TRANSIENT ones if asked)"""
+        return {
+            name: _plain(getattr(self, name)) for name in self.__slots__
+            if transient or name not in self.TRANSIENT
+        }
+
+    @classmethod
+    def from_dict(cls, values: Dict) -> "Record":
+        """Rebuild a record from the output of to_dict()"""
+        fields = {}
+        for name, value in values.items():
+            nested = cls.NESTED.get(name)
+            if nested is not None and isinstance(value, list):
+                value = [nested.from_dict(item) for item in value]
+            elif nested is not None and value is not None:
+                value = nested.from_dict(value)
+            fields[name] = value
+        return cls(**fields)
+
+    def update(self, values: Dict):
+        """Overwrite fields from a dictionary of parsed values"""
+        for name, value in values.items():
+            setattr(self, name, value)
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+def _plain(value):
+    """Expand a record, or a list of records, into plain dictionaries"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    return value
+
+class Listing(Record):
+    """One listing parsed from a results page (fields missing on a site stay None)"""
+    __slots__ = ("id", "price", "sqm", "rooms", "address", "days_on_market")
+
+class PropertyData(Record):
+    """
+    Yad2 property metrics for one city
+
+    The combined_* metrics cover the sale listings of Yad2 and Madlan
+    together, with apartments listed on both counted once; they are only
+    set when both sources' listings were scraped.
+    """
+    __slots__ = ("avg_price_per_sqm", "avg_rent_3br", "listings_count", "price_trend",
+                 "combined_avg_price_per_sqm", "combined_listings_count")
+
+class MarketAnalytics(Record):
+    """Madlan market analytics for one city"""
+    __slots__ = ("market_index", "price_change_1y", "demand_level", "supply_level",
+                 "avg_days_on_market", "neighborhood_scores")
+
+class Neighborhood(Record):
+    """Madlan metrics for one neighborhood of a city (scores as in neighborhood_scores)"""
+    __slots__ = ("name", "listings_count", "avg_price", "avg_days_on_market", "scores")
+
+class CostOfLiving(Record):
+    """Numbeo cost-of-living breakdown for one city"""
+    __slots__ = ("housing", "groceries", "transportation", "utilities", "dining",
+                 "total_monthly", "cost_index", "quality_of_life_index")
+
+class SourceRecord(Record):
+    """
+    One source's result for one city
+
+    Each source keeps the key names of its JSON output: the name the
+    source uses for the city and the field holding its metrics record.
+    """
+    __slots__ = ()
+
+class Yad2Record(SourceRecord):
+    __slots__ = ("city", "city_hebrew", "timestamp", "source", "source_url", "data", "listings")
+    NESTED = {"data": PropertyData, "listings": Listing}
+    # Sale listings, held (and checkpointed) only until the cross-source deduplication
+    TRANSIENT = ("listings",)
+
+class MadlanRecord(SourceRecord):
+    __slots__ = ("city", "city_hebrew", "timestamp", "source", "source_url", "analytics", "neighborhoods",
+                 "listings")
+    NESTED = {"analytics": MarketAnalytics, "neighborhoods": Neighborhood, "listings": Listing}
+    TRANSIENT = ("listings",)
+
+class NumbeoRecord(SourceRecord):
+    __slots__ = ("city", "city_display", "timestamp", "source", "source_url", "cost_of_living")
+    NESTED = {"cost_of_living": CostOfLiving}
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Retries and Circuit Breaking
+Bounded, jittered exponential backoff for transient failures and a
+per-host circuit breaker that stops sending requests to a failing site
+"""
+
+import random
+import threading
+import time
+from typing import Optional
+
+import requests
+
+# Status codes worth retrying: rate limiting and server-side errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of sending a request to a host whose circuit is open"""
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = 4, base_delay: float = 1.0, max_delay: float = 60.0):
+        """
+        Args:
+            max_attempts: Attempts per request, including the first one
+            base_delay: Backoff before the first retry, doubled for each further retry
+            max_delay: Longest backoff; a Retry-After beyond this gives up instead of waiting
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Seconds to wait before retrying after the given (1-based) attempt
+
+        Uses "full jitter": a random delay up to the exponential bound, so
+        workers that failed together do not retry in lockstep.
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 120.0):
+        """
+        Circuit breaker for a single host
+
+        The circuit opens after failure_threshold consecutive failures and
+        rejects requests for reset_timeout seconds. After that one trial
+        request is let through: success closes the circuit, failure opens
+        it again.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a trial request
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.open_until: Optional[float] = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Current state: closed, open or half-open"""
+        with self.lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now: float) -> str:
+        if self.open_until is None:
+            return "closed"
+        if now < self.open_until:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        """Check whether a request may be sent now"""
+        with self.lock:
+            state = self._state(time.monotonic())
+            if state == "closed":
+                return True
+            if state == "half-open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        """Close the circuit after a request the host handled"""
+        with self.lock:
+            self.failures = 0
+            self.open_until = None
+            self.trial_in_flight = False
+
+    def record_failure(self) -> bool:
+        """
+        Count a failed request
+
+        Returns:
+            True if this failure opened the circuit
+        """
+        with self.lock:
+            self.failures += 1
+            # A failed trial reopens the circuit; failures of requests sent
+            # before it opened do not extend the timeout
+            if self.trial_in_flight or (self.open_until is None and self.failures >= self.failure_threshold):
+                self.open_until = time.monotonic() + self.reset_timeout
+                self.trial_in_flight = False
+                return True
+            return False
+
+    def trip(self, seconds: float):
+        """Open the circuit for at least the given time (e.g. a long Retry-After)"""
+        with self.lock:
+            self.open_until = max(self.open_until or 0.0, time.monotonic() + seconds)
+            self.trial_in_flight = False
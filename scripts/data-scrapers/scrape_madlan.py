@@ -4,75 +4,146 @@ Madlan Real Estate Analytics Scraper
 Collects market trends and property analytics for Israeli cities
 """
 
-import requests
-from bs4 import BeautifulSoup
 import json
-import time
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional
 
-# Target cities for data collection
-CITIES = {
-    "beit_shemesh": "בית שמש",
-    "modiin": "מודיעין-מכבים-רעות",
-    "rehovot": "רחובות",
-    "netanya": "נתניה",
-    "haifa": "חיפה"
+from bs4 import BeautifulSoup, SoupStrainer
+
+from checkpoints import batches
+from city_registry import city_names, load_cities
+from html_parsing import make_soup, parse_number
+from http_client import NOT_FETCHED, HttpClient
+from instrumentation import Instrumentation
+from listing_stats import ListingStats
+from neighborhoods import rollup
+from records import Listing, MadlanRecord, MarketAnalytics, Neighborhood
+
+# Target cities for data collection, mapped to their Madlan city page slugs
+CITIES = city_names(load_cities(), "madlan_slug")
+
+# Numeric statistics published in the city-stats block
+NUMERIC_STATS = {
+    "market_index": float,
+    "price_change_1y": float,
+    "avg_days_on_market": int
 }
 
+# Text statistics published in the city-stats block
+LEVEL_STATS = ("demand_level", "supply_level")
+
+# Numeric statistics published for each neighborhood
+NEIGHBORHOOD_STATS = {
+    "listings_count": int,
+    "avg_price": int,
+    "avg_days_on_market": int
+}
+
+# Only the city-stats block, the neighborhood blocks and the listing cards
+# are built when parsing city pages
+CITY_PAGE_STRAINER = SoupStrainer(class_=["city-stats", "neighborhood", "listing-card"])
+
 class MadlanScraper:
-    def __init__(self):
+    def __init__(self, client: HttpClient = None, live: bool = False, cities: Dict[str, str] = None,
+                 checkpoints=None, instrumentation: Instrumentation = None):
+        """
+        Args:
+            client: Shared HTTP client (a private one is created if omitted)
+            live: Fetch and parse the real city pages instead of using estimates
+            cities: Cities to scrape, city name to Madlan slug (defaults to CITIES)
+            checkpoints: checkpoints.CheckpointStore that completed cities are saved to
+            instrumentation: Run timings recorder (a private one is created if omitted)
+        """
         self.base_url = "https://www.madlan.co.il"
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
+        self.client = client or HttpClient()
+        self.live = live
+        self.cities = CITIES if cities is None else cities
+        self.checkpoints = checkpoints
+        self.instrumentation = instrumentation or Instrumentation()
     
-    def scrape_city_analytics(self, city_name: str, city_hebrew: str) -> Dict:
+    def city_url(self, city_hebrew: str) -> str:
+        """City page URL"""
+        return f"{self.base_url}/city/{city_hebrew}"
+    
+    def fetch_city_pages(self, cities: Dict[str, str]) -> Dict[str, Optional[bytes]]:
+        """
+        Fetch the city pages for many cities concurrently
+        
+        Args:
+            cities: Mapping of city name to Hebrew name
+            
+        Returns:
+            Mapping of city name to page body
+        """
+        urls = {city: self.city_url(hebrew) for city, hebrew in cities.items()}
+        bodies = self.client.fetch_bodies(list(urls.values()))
+        return {city: bodies.get(url) for city, url in urls.items()}
+    
+    def scrape_city_analytics(self, city_name: str, city_hebrew: str,
+                              page: Optional[bytes] = NOT_FETCHED) -> Optional[MadlanRecord]:
         """
         Scrape market analytics for a specific city
         
         Args:
             city_name: English name of the city
             city_hebrew: Hebrew name of the city
+            page: Pre-fetched city page, None if its fetch failed (live mode only)
             
         Returns:
-            Dictionary containing market analytics
+            Market analytics record for the city, or None if its page could not be fetched
         """
         print(f"Scraping analytics for {city_name}...")
         
         try:
-            # Simulate API call delay
-            time.sleep(1)
+            analytics = MarketAnalytics(
+                market_index=self._get_market_index(city_name),
+                price_change_1y=self._get_price_change(city_name),
+                demand_level=self._get_demand_level(city_name),
+                supply_level=self._get_supply_level(city_name),
+                avg_days_on_market=self._get_avg_days_on_market(city_name),
+                neighborhood_scores=self._get_neighborhood_scores(city_name)
+            )
+            neighborhoods = listings = None
             
-            # In production, you would:
-            # 1. Make requests to Madlan city pages
-            # 2. Parse market statistics and trends
-            # 3. Extract price indices and analytics
-            # 4. Collect historical data for trends
+            if self.live:
+                if page is NOT_FETCHED:
+                    page = self.fetch_city_pages({city_name: city_hebrew})[city_name]
+                # Without the page there is nothing scraped; estimates only fill in
+                # what a page that did arrive lacks
+                if not page:
+                    print(f"Error scraping analytics for {city_name}: no city page")
+                    return None
+                soup = make_soup(page, CITY_PAGE_STRAINER)
+                
+                # Values parsed from the live page replace the estimates
+                stats = self._parse_city_stats(soup)
+                scores = stats.pop("neighborhood_scores", {})
+                analytics.update(stats)
+                analytics.neighborhood_scores = dict(analytics.neighborhood_scores, **scores)
+                
+                # Per-neighborhood figures, rolled up to the city once all cities are in
+                neighborhoods = self._parse_neighborhoods(soup) or None
+                
+                # Days on market computed from the listings beats the published figure;
+                # the listings are also kept for cross-source deduplication
+                listings = list(self._parse_listings(soup))
+                listing_stats = ListingStats.from_listings(listings)
+                if len(listing_stats):
+                    analytics.avg_days_on_market = self._get_avg_days_on_market(city_name, listing_stats)
+            else:
+                # Wait for a request slot on this host
+                self.client.throttle(self.base_url)
             
-            # Example of actual scraping approach:
-            # city_url = f"{self.base_url}/city/{city_hebrew}"
-            # response = self.session.get(city_url)
-            # soup = BeautifulSoup(response.content, 'html.parser')
-            # stats = soup.find('div', class_='city-stats')
-            
-            data = {
-                "city": city_name,
-                "city_hebrew": city_hebrew,
-                "timestamp": datetime.now().isoformat(),
-                "source": "Madlan",
-                "source_url": f"{self.base_url}/city",
-                "analytics": {
-                    "market_index": self._get_market_index(city_name),
-                    "price_change_1y": self._get_price_change(city_name),
-                    "demand_level": self._get_demand_level(city_name),
-                    "supply_level": self._get_supply_level(city_name),
-                    "avg_days_on_market": self._get_avg_days_on_market(city_name),
-                    "neighborhood_scores": self._get_neighborhood_scores(city_name)
-                }
-            }
+            data = MadlanRecord(
+                city=city_name,
+                city_hebrew=city_hebrew,
+                timestamp=datetime.now().isoformat(),
+                source="Madlan",
+                source_url=f"{self.base_url}/city",
+                analytics=analytics,
+                neighborhoods=neighborhoods,
+                listings=listings
+            )
             
             return data
             
@@ -80,6 +151,64 @@ class MadlanScraper:
             print(f"Error scraping analytics for {city_name}: {str(e)}")
             return None
     
+    def _parse_city_stats(self, soup: BeautifulSoup) -> Dict:
+        """Extract market statistics from the city-stats block of a city page"""
+        stats = soup.find('div', class_='city-stats')
+        if stats is None:
+            return {}
+        
+        analytics = {}
+        for item in stats.find_all(attrs={"data-stat": True}):
+            name = item["data-stat"]
+            text = item.get_text(strip=True)
+            if name in NUMERIC_STATS:
+                value = parse_number(text)
+                if value is not None:
+                    analytics[name] = NUMERIC_STATS[name](value)
+            elif name in LEVEL_STATS and text:
+                analytics[name] = text.lower()
+        
+        scores = {}
+        for item in stats.find_all(attrs={"data-score": True}):
+            value = parse_number(item.get_text(strip=True))
+            if value is not None:
+                scores[item["data-score"]] = value
+        if scores:
+            analytics["neighborhood_scores"] = scores
+        
+        return analytics
+    
+    def _parse_neighborhoods(self, soup: BeautifulSoup) -> List[Neighborhood]:
+        """Extract the per-neighborhood statistics and scores of a city page"""
+        neighborhoods = []
+        for block in soup.find_all('div', class_='neighborhood'):
+            neighborhood = Neighborhood(name=block.get('data-name'), scores={})
+            for item in block.find_all(attrs={"data-stat": True}):
+                name = item["data-stat"]
+                value = parse_number(item.get_text(strip=True))
+                if name in NEIGHBORHOOD_STATS and value is not None:
+                    setattr(neighborhood, name, NEIGHBORHOOD_STATS[name](value))
+            for item in block.find_all(attrs={"data-score": True}):
+                value = parse_number(item.get_text(strip=True))
+                if value is not None:
+                    neighborhood.scores[item["data-score"]] = value
+            if neighborhood.name:
+                neighborhoods.append(neighborhood)
+        return neighborhoods
+    
+    def _parse_listings(self, soup: BeautifulSoup) -> Iterator[Listing]:
+        """Extract the listing cards of a city page"""
+        for card in soup.find_all('div', class_='listing-card'):
+            address = card.find(class_='address')
+            yield Listing(
+                id=card.get('data-id'),
+                price=parse_number(card.get('data-price')),
+                sqm=parse_number(card.get('data-square-meters')),
+                rooms=parse_number(card.get('data-rooms')),
+                address=address.get_text(strip=True) if address else None,
+                days_on_market=parse_number(card.get('data-days-on-market'))
+            )
+    
     def _get_market_index(self, city: str) -> float:
         """Get market strength index (0-100)"""
         indices = {
@@ -124,8 +253,13 @@ class MadlanScraper:
         }
         return supply.get(city, "medium")
     
-    def _get_avg_days_on_market(self, city: str) -> int:
+    def _get_avg_days_on_market(self, city: str, listings: ListingStats = None) -> int:
         """Get average days properties stay on market"""
+        if listings is not None:
+            mean = listings.robust_mean("days_on_market")
+            if mean is not None:
+                return round(mean)
+        
         days = {
             "beit_shemesh": 45,
             "modiin": 32,
@@ -136,8 +270,13 @@ class MadlanScraper:
         return days.get(city, 50)
     
     def _get_neighborhood_scores(self, city: str) -> Dict:
-        """Get scores for different neighborhood aspects"""
-        # This would aggregate data from multiple neighborhoods
+        """
+        Get scores for different neighborhood aspects
+        
+        These city-wide estimates are replaced by the rollup of the
+        per-neighborhood scores when a live page lists neighborhoods
+        (see apply_neighborhood_rollup).
+        """
         scores = {
             "beit_shemesh": {
                 "schools": 8.5,
@@ -177,19 +316,43 @@ class MadlanScraper:
             "safety": 8.0
         })
     
-    def scrape_all_cities(self) -> List[Dict]:
+    def scrape_all_cities(self) -> List[MadlanRecord]:
         """Scrape analytics for all target cities"""
-        results = []
+        done = {}
+        if self.checkpoints is not None:
+            done = self.checkpoints.completed("madlan", MadlanRecord, self.cities)
+        pending = {city: name for city, name in self.cities.items() if city not in done}
         
-        for city_key, city_hebrew in CITIES.items():
-            data = self.scrape_city_analytics(city_key, city_hebrew)
-            if data:
-                results.append(data)
+        # In live mode city pages are requested a batch at a time over the shared client,
+        # and each batch is checkpointed before the next one is fetched
+        for batch in batches(pending) if self.live else [pending]:
+            pages = {}
+            if self.live:
+                with self.instrumentation.timed("fetch", "madlan"):
+                    pages = self.fetch_city_pages(batch)
             
-            # Rate limiting
-            time.sleep(2)
+            # Pre-fetched pages are only parsed; otherwise the city is scraped end to end
+            stage = "parse" if pages else "scrape"
+            for city_key, city_hebrew in batch.items():
+                with self.instrumentation.timed(stage, "madlan", city_key):
+                    data = self.scrape_city_analytics(city_key, city_hebrew, pages.get(city_key, NOT_FETCHED))
+                if data:
+                    done[city_key] = data
+                    if self.checkpoints is not None:
+                        self.checkpoints.save("madlan", data)
+        
+        results = [done[city] for city in self.cities if city in done]
+        self.apply_neighborhood_rollup(results)
         
         return results
+    
+    def apply_neighborhood_rollup(self, results: List[MadlanRecord]):
+        """Replace city-wide neighborhood scores with the weighted rollup of each city's neighborhoods"""
+        scores = rollup({r.city: r.neighborhoods for r in results if r.neighborhoods})
+        for result in results:
+            if scores.get(result.city):
+                result.analytics.neighborhood_scores = dict(result.analytics.neighborhood_scores,
+                                                            **scores[result.city])
 
 def main():
     """Main execution function"""
@@ -206,7 +369,7 @@ def main():
             "last_updated": datetime.now().isoformat(),
             "source": "Madlan",
             "source_url": "https://www.madlan.co.il",
-            "cities": results
+            "cities": [result.to_dict() for result in results]
         }, f, ensure_ascii=False, indent=2)
     
     print(f"\nData saved to {output_file}")
@@ -4,77 +4,366 @@ Numbeo Cost of Living Data Scraper
 Collects cost-of-living data for Israeli cities
 """
 
-import requests
-from bs4 import BeautifulSoup
 import json
-import time
+import re
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-# Target cities for data collection
-CITIES = {
-    "beit_shemesh": "Beit Shemesh",
-    "modiin": "Modiin",
-    "rehovot": "Rehovot",
-    "netanya": "Netanya",
-    "haifa": "Haifa"
+from bs4 import SoupStrainer
+
+from checkpoints import batches
+from city_registry import city_names, load_cities
+from html_parsing import make_soup, parse_number
+from http_client import NOT_FETCHED, HttpClient
+from instrumentation import Instrumentation
+from records import CostOfLiving, NumbeoRecord
+
+# Target cities for data collection, mapped to their Numbeo display names
+CITIES = city_names(load_cities(), "numbeo_name")
+
+# Built-in estimates per city, used outside --live mode and for anything a
+# live page does not list. Utility totals, weekly groceries and the monthly
+# total are derived from these (see NumbeoScraper._derive_totals).
+ESTIMATES = {
+    "beit_shemesh": {
+        "housing": {
+            "rent_1br_center": 3800,
+            "rent_1br_outside": 3200,
+            "rent_3br_center": 5500,
+            "rent_3br_outside": 4900,
+            "price_per_sqm_center": 20000,
+            "price_per_sqm_outside": 17500
+        },
+        "groceries": {
+            "monthly": 3500
+        },
+        "transportation": {
+            "monthly_pass": 250,
+            "taxi_start": 12,
+            "taxi_per_km": 5.5,
+            "gasoline_liter": 7.2
+        },
+        "utilities": {
+            "electricity": 450,
+            "water": 180,
+            "internet": 120,
+            "phone": 50
+        },
+        "dining": {
+            "inexpensive_meal": 60,
+            "mid_range_meal_2p": 250,
+            "coffee": 14
+        },
+        "cost_index": 78.5,
+        "quality_of_life_index": 142.5
+    },
+    "modiin": {
+        "housing": {
+            "rent_1br_center": 4500,
+            "rent_1br_outside": 3800,
+            "rent_3br_center": 7000,
+            "rent_3br_outside": 6200,
+            "price_per_sqm_center": 24000,
+            "price_per_sqm_outside": 20500
+        },
+        "groceries": {
+            "monthly": 3800
+        },
+        "transportation": {
+            "monthly_pass": 280,
+            "taxi_start": 12,
+            "taxi_per_km": 5.5,
+            "gasoline_liter": 7.2
+        },
+        "utilities": {
+            "electricity": 480,
+            "water": 190,
+            "internet": 130,
+            "phone": 50
+        },
+        "dining": {
+            "inexpensive_meal": 70,
+            "mid_range_meal_2p": 280,
+            "coffee": 16
+        },
+        "cost_index": 89.2,
+        "quality_of_life_index": 168.3
+    },
+    "rehovot": {
+        "housing": {
+            "rent_1br_center": 4000,
+            "rent_1br_outside": 3400,
+            "rent_3br_center": 6200,
+            "rent_3br_outside": 5500,
+            "price_per_sqm_center": 22000,
+            "price_per_sqm_outside": 19500
+        },
+        "groceries": {
+            "monthly": 3600
+        },
+        "transportation": {
+            "monthly_pass": 260,
+            "taxi_start": 12,
+            "taxi_per_km": 5.5,
+            "gasoline_liter": 7.2
+        },
+        "utilities": {
+            "electricity": 450,
+            "water": 180,
+            "internet": 120,
+            "phone": 50
+        },
+        "dining": {
+            "inexpensive_meal": 65,
+            "mid_range_meal_2p": 260,
+            "coffee": 15
+        },
+        "cost_index": 82.7,
+        "quality_of_life_index": 155.8
+    },
+    "netanya": {
+        "housing": {
+            "rent_1br_center": 3600,
+            "rent_1br_outside": 3000,
+            "rent_3br_center": 5300,
+            "rent_3br_outside": 4600,
+            "price_per_sqm_center": 19500,
+            "price_per_sqm_outside": 16500
+        },
+        "groceries": {
+            "monthly": 3400
+        },
+        "transportation": {
+            "monthly_pass": 240,
+            "taxi_start": 12,
+            "taxi_per_km": 5.5,
+            "gasoline_liter": 7.2
+        },
+        "utilities": {
+            "electricity": 420,
+            "water": 170,
+            "internet": 110,
+            "phone": 50
+        },
+        "dining": {
+            "inexpensive_meal": 60,
+            "mid_range_meal_2p": 240,
+            "coffee": 14
+        },
+        "cost_index": 75.3,
+        "quality_of_life_index": 138.2
+    },
+    "haifa": {
+        "housing": {
+            "rent_1br_center": 3400,
+            "rent_1br_outside": 2800,
+            "rent_3br_center": 4900,
+            "rent_3br_outside": 4200,
+            "price_per_sqm_center": 18000,
+            "price_per_sqm_outside": 15500
+        },
+        "groceries": {
+            "monthly": 3300
+        },
+        "transportation": {
+            "monthly_pass": 230,
+            "taxi_start": 12,
+            "taxi_per_km": 5.5,
+            "gasoline_liter": 7.2
+        },
+        "utilities": {
+            "electricity": 400,
+            "water": 160,
+            "internet": 110,
+            "phone": 50
+        },
+        "dining": {
+            "inexpensive_meal": 55,
+            "mid_range_meal_2p": 230,
+            "coffee": 13
+        },
+        "cost_index": 71.8,
+        "quality_of_life_index": 145.9
+    }
+}
+
+# Estimates for cities without their own entry
+DEFAULT_ESTIMATE = dict(ESTIMATES["beit_shemesh"], cost_index=80.0, quality_of_life_index=150.0)
+
+# Numbeo cost table rows whose price is copied into our output
+COST_ITEMS = {
+    "Apartment (1 bedroom) in City Centre": ("housing", "rent_1br_center"),
+    "Apartment (1 bedroom) Outside of Centre": ("housing", "rent_1br_outside"),
+    "Apartment (3 bedrooms) in City Centre": ("housing", "rent_3br_center"),
+    "Apartment (3 bedrooms) Outside of Centre": ("housing", "rent_3br_outside"),
+    "Price per Square Meter to Buy Apartment in City Centre": ("housing", "price_per_sqm_center"),
+    "Price per Square Meter to Buy Apartment Outside of Centre": ("housing", "price_per_sqm_outside"),
+    "Monthly Pass (Regular Price)": ("transportation", "monthly_pass"),
+    "Taxi Start (Normal Tariff)": ("transportation", "taxi_start"),
+    "Taxi 1km (Normal Tariff)": ("transportation", "taxi_per_km"),
+    "Gasoline (1 liter)": ("transportation", "gasoline_liter"),
+    "Internet (60 Mbps or More, Unlimited Data, Cable/ADSL)": ("utilities", "internet"),
+    "Mobile Phone Monthly Plan with Calls and 10GB+ Data": ("utilities", "phone"),
+    "Meal, Inexpensive Restaurant": ("dining", "inexpensive_meal"),
+    "Meal for 2 People, Mid-range Restaurant, Three-course": ("dining", "mid_range_meal_2p"),
+    "Cappuccino (regular)": ("dining", "coffee")
 }
 
+# Numbeo's combined utilities row, split into electricity and water in the
+# proportion of the city's estimates
+BASIC_UTILITIES_ITEM = "Basic (Electricity, Heating, Cooling, Water, Garbage) for 85m2 Apartment"
+
+# Monthly groceries of a family of four, in kg, liters or pieces of each
+# Numbeo market item (whatever pack size the row is priced in)
+GROCERY_BASKET = {
+    "Milk (regular), (1 liter)": 25,
+    "Loaf of Fresh White Bread (500g)": 12,
+    "Rice (white), (1kg)": 4,
+    "Eggs (regular) (12)": 90,
+    "Local Cheese (1kg)": 4,
+    "Chicken Fillets (1kg)": 8,
+    "Beef Round (1kg) (or Equivalent Back Leg Red Meat)": 4,
+    "Apples (1kg)": 8,
+    "Banana (1kg)": 6,
+    "Oranges (1kg)": 8,
+    "Tomato (1kg)": 10,
+    "Potato (1kg)": 8,
+    "Onion (1kg)": 4,
+    "Lettuce (1 head)": 8,
+    "Water (1.5 liter bottle)": 45
+}
+
+# Share of a family's grocery bill the basket staples account for; the
+# rest (household goods, snacks, ...) is scaled up from the basket cost
+GROCERY_BASKET_SHARE = 0.6
+
+# Monthly budget of a family of four: (category, item) and how many of it
+MONTHLY_BUDGET = (
+    (("housing", "rent_3br_center"), 1),
+    (("groceries", "monthly"), 1),
+    (("utilities", "total"), 1),
+    (("transportation", "monthly_pass"), 2),
+    (("dining", "mid_range_meal_2p"), 2)
+)
+
+# Pack sizes in item names, e.g. "(500g)", "(1.5 liter bottle)" or "(12)",
+# converted to kg, liters or pieces
+PACK_SIZE_PATTERN = re.compile(r"\((\d+(?:\.\d+)?)\s*(kg|g|liter|l\b|head)?[^)]*\)")
+PACK_UNITS = {"kg": 1.0, "g": 0.001, "liter": 1.0, "l": 1.0, "head": 1.0, None: 1.0}
+
+# Pages are requested in shekels; a price cell marked with another currency
+# (e.g. if the parameter is ignored) is not converted but left unparsed
+DISPLAY_CURRENCY = "ILS"
+CURRENCIES = {"₪": "ILS", "ILS": "ILS", "$": "USD", "USD": "USD", "€": "EUR", "EUR": "EUR"}
+
+# Only the cost table rows are built when parsing city pages
+COST_ITEMS_STRAINER = SoupStrainer('tr', class_='cost-item')
+
+def pack_size(item: str) -> float:
+    """
+    Quantity a Numbeo row is priced for, in kg, liters or pieces
+
+    Example: "Loaf of Fresh White Bread (500g)" -> 0.5
+    """
+    match = PACK_SIZE_PATTERN.search(item)
+    if not match:
+        return 1.0
+    return float(match.group(1)) * PACK_UNITS[match.group(2)]
+
+def price_in_ils(text: str) -> Optional[float]:
+    """
+    Parse a shekel price cell (cells without a currency are taken as shekels)
+
+    Returns:
+        The price, or None if the cell has no number or is in another currency
+    """
+    price = parse_number(text)
+    if price is None:
+        return None
+    currency = next((code for marker, code in CURRENCIES.items() if marker in text), DISPLAY_CURRENCY)
+    if currency != DISPLAY_CURRENCY:
+        return None
+    return round(price, 2)
+
 class NumbeoScraper:
-    def __init__(self):
+    def __init__(self, client: HttpClient = None, live: bool = False, cities: Dict[str, str] = None,
+                 checkpoints=None, instrumentation: Instrumentation = None):
+        """
+        Args:
+            client: Shared HTTP client (a private one is created if omitted)
+            live: Fetch and parse the real city pages instead of using estimates
+            cities: Cities to scrape, city name to Numbeo display name (defaults to CITIES)
+            checkpoints: checkpoints.CheckpointStore that completed cities are saved to
+            instrumentation: Run timings recorder (a private one is created if omitted)
+        """
         self.base_url = "https://www.numbeo.com/cost-of-living"
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
+        self.client = client or HttpClient()
+        self.live = live
+        self.cities = CITIES if cities is None else cities
+        self.checkpoints = checkpoints
+        self.instrumentation = instrumentation or Instrumentation()
+    
+    def city_url(self, city_display: str) -> str:
+        """City cost-of-living page URL, with prices displayed in shekels"""
+        return f"{self.base_url}/in/{city_display.replace(' ', '-')}?displayCurrency={DISPLAY_CURRENCY}"
+    
+    def fetch_city_pages(self, cities: Dict[str, str]) -> Dict[str, Optional[bytes]]:
+        """
+        Fetch the cost-of-living pages for many cities concurrently
+        
+        Args:
+            cities: Mapping of city name to Numbeo display name
+            
+        Returns:
+            Mapping of city name to page body
+        """
+        urls = {city: self.city_url(display) for city, display in cities.items()}
+        bodies = self.client.fetch_bodies(list(urls.values()))
+        return {city: bodies.get(url) for city, url in urls.items()}
     
-    def scrape_city_cost_of_living(self, city_name: str, city_display: str) -> Dict:
+    def scrape_city_cost_of_living(self, city_name: str, city_display: str,
+                                   page: Optional[bytes] = NOT_FETCHED) -> Optional[NumbeoRecord]:
         """
         Scrape cost-of-living data for a specific city
         
         Args:
             city_name: Internal name of the city
             city_display: Display name for Numbeo
+            page: Pre-fetched city page, None if its fetch failed (live mode only)
             
         Returns:
-            Dictionary containing cost-of-living data
+            Cost-of-living record for the city, or None if its page could not be fetched
         """
         print(f"Scraping cost-of-living for {city_display}...")
         
         try:
-            # Simulate API call delay
-            time.sleep(1)
+            cost_of_living = self._get_estimates(city_name)
             
-            # In production, you would:
-            # 1. Make requests to Numbeo city pages
-            # 2. Parse cost tables for various categories
-            # 3. Extract currency-converted values
-            # 4. Collect quality of life indices
+            if self.live:
+                if page is NOT_FETCHED:
+                    page = self.fetch_city_pages({city_name: city_display})[city_name]
+                # Without the page there is nothing scraped; estimates only fill in
+                # what a page that did arrive lacks
+                if not page:
+                    print(f"Error scraping cost-of-living for {city_display}: no city page")
+                    return None
+                # Prices parsed from the live page replace the estimates
+                self._apply_cost_table(cost_of_living, self._parse_cost_table(page))
+            else:
+                # Wait for a request slot on this host
+                self.client.throttle(self.base_url)
             
-            # Example of actual scraping:
-            # city_url = f"{self.base_url}/in/{city_display}"
-            # response = self.session.get(city_url)
-            # soup = BeautifulSoup(response.content, 'html.parser')
-            # costs = soup.find_all('tr', class_='cost-item')
+            # Totals always follow from the parts, estimated or parsed
+            self._derive_totals(cost_of_living)
             
-            data = {
-                "city": city_name,
-                "city_display": city_display,
-                "timestamp": datetime.now().isoformat(),
-                "source": "Numbeo",
-                "source_url": f"{self.base_url}/in/{city_display.replace(' ', '-')}",
-                "cost_of_living": {
-                    "housing": self._get_housing_costs(city_name),
-                    "groceries": self._get_grocery_costs(city_name),
-                    "transportation": self._get_transportation_costs(city_name),
-                    "utilities": self._get_utility_costs(city_name),
-                    "dining": self._get_dining_costs(city_name),
-                    "total_monthly": self._get_total_monthly(city_name),
-                    "cost_index": self._get_cost_index(city_name),
-                    "quality_of_life_index": self._get_quality_index(city_name)
-                }
-            }
+            data = NumbeoRecord(
+                city=city_name,
+                city_display=city_display,
+                timestamp=datetime.now().isoformat(),
+                source="Numbeo",
+                source_url=self.city_url(city_display),
+                cost_of_living=cost_of_living
+            )
             
             return data
             
@@ -82,217 +371,96 @@ class NumbeoScraper:
             print(f"Error scraping cost-of-living for {city_display}: {str(e)}")
             return None
     
-    def _get_housing_costs(self, city: str) -> Dict:
-        """Get housing cost breakdown"""
-        costs = {
-            "beit_shemesh": {
-                "rent_1br_center": 3800,
-                "rent_1br_outside": 3200,
-                "rent_3br_center": 5500,
-                "rent_3br_outside": 4900,
-                "price_per_sqm_center": 20000,
-                "price_per_sqm_outside": 17500
-            },
-            "modiin": {
-                "rent_1br_center": 4500,
-                "rent_1br_outside": 3800,
-                "rent_3br_center": 7000,
-                "rent_3br_outside": 6200,
-                "price_per_sqm_center": 24000,
-                "price_per_sqm_outside": 20500
-            },
-            "rehovot": {
-                "rent_1br_center": 4000,
-                "rent_1br_outside": 3400,
-                "rent_3br_center": 6200,
-                "rent_3br_outside": 5500,
-                "price_per_sqm_center": 22000,
-                "price_per_sqm_outside": 19500
-            },
-            "netanya": {
-                "rent_1br_center": 3600,
-                "rent_1br_outside": 3000,
-                "rent_3br_center": 5300,
-                "rent_3br_outside": 4600,
-                "price_per_sqm_center": 19500,
-                "price_per_sqm_outside": 16500
-            },
-            "haifa": {
-                "rent_1br_center": 3400,
-                "rent_1br_outside": 2800,
-                "rent_3br_center": 4900,
-                "rent_3br_outside": 4200,
-                "price_per_sqm_center": 18000,
-                "price_per_sqm_outside": 15500
-            }
-        }
-        return costs.get(city, costs["beit_shemesh"])
-    
-    def _get_grocery_costs(self, city: str) -> Dict:
-        """Get monthly grocery costs for family of 4"""
-        costs = {
-            "beit_shemesh": {"monthly": 3500, "weekly": 875},
-            "modiin": {"monthly": 3800, "weekly": 950},
-            "rehovot": {"monthly": 3600, "weekly": 900},
-            "netanya": {"monthly": 3400, "weekly": 850},
-            "haifa": {"monthly": 3300, "weekly": 825}
-        }
-        return costs.get(city, {"monthly": 3500, "weekly": 875})
-    
-    def _get_transportation_costs(self, city: str) -> Dict:
-        """Get transportation costs"""
-        costs = {
-            "beit_shemesh": {
-                "monthly_pass": 250,
-                "taxi_start": 12,
-                "taxi_per_km": 5.5,
-                "gasoline_liter": 7.2
-            },
-            "modiin": {
-                "monthly_pass": 280,
-                "taxi_start": 12,
-                "taxi_per_km": 5.5,
-                "gasoline_liter": 7.2
-            },
-            "rehovot": {
-                "monthly_pass": 260,
-                "taxi_start": 12,
-                "taxi_per_km": 5.5,
-                "gasoline_liter": 7.2
-            },
-            "netanya": {
-                "monthly_pass": 240,
-                "taxi_start": 12,
-                "taxi_per_km": 5.5,
-                "gasoline_liter": 7.2
-            },
-            "haifa": {
-                "monthly_pass": 230,
-                "taxi_start": 12,
-                "taxi_per_km": 5.5,
-                "gasoline_liter": 7.2
-            }
-        }
-        return costs.get(city, costs["beit_shemesh"])
-    
-    def _get_utility_costs(self, city: str) -> Dict:
-        """Get monthly utility costs"""
-        costs = {
-            "beit_shemesh": {
-                "electricity": 450,
-                "water": 180,
-                "internet": 120,
-                "phone": 50,
-                "total": 800
-            },
-            "modiin": {
-                "electricity": 480,
-                "water": 190,
-                "internet": 130,
-                "phone": 50,
-                "total": 850
-            },
-            "rehovot": {
-                "electricity": 450,
-                "water": 180,
-                "internet": 120,
-                "phone": 50,
-                "total": 800
-            },
-            "netanya": {
-                "electricity": 420,
-                "water": 170,
-                "internet": 110,
-                "phone": 50,
-                "total": 750
-            },
-            "haifa": {
-                "electricity": 400,
-                "water": 160,
-                "internet": 110,
-                "phone": 50,
-                "total": 720
-            }
-        }
-        return costs.get(city, costs["beit_shemesh"])
-    
-    def _get_dining_costs(self, city: str) -> Dict:
-        """Get dining out costs"""
-        costs = {
-            "beit_shemesh": {
-                "inexpensive_meal": 60,
-                "mid_range_meal_2p": 250,
-                "coffee": 14
-            },
-            "modiin": {
-                "inexpensive_meal": 70,
-                "mid_range_meal_2p": 280,
-                "coffee": 16
-            },
-            "rehovot": {
-                "inexpensive_meal": 65,
-                "mid_range_meal_2p": 260,
-                "coffee": 15
-            },
-            "netanya": {
-                "inexpensive_meal": 60,
-                "mid_range_meal_2p": 240,
-                "coffee": 14
-            },
-            "haifa": {
-                "inexpensive_meal": 55,
-                "mid_range_meal_2p": 230,
-                "coffee": 13
-            }
-        }
-        return costs.get(city, costs["beit_shemesh"])
+    def _parse_cost_table(self, page: Optional[bytes]) -> Dict[str, float]:
+        """
+        Extract the whole cost table of a city page in one pass
+        
+        Returns:
+            Flat mapping of Numbeo item name to price in shekels
+        """
+        if not page:
+            return {}
+        
+        soup = make_soup(page, COST_ITEMS_STRAINER)
+        prices = {}
+        for row in soup.find_all('tr', class_='cost-item'):
+            cells = row.find_all('td')
+            if len(cells) < 2:
+                continue
+            price = price_in_ils(cells[1].get_text(strip=True))
+            if price is not None:
+                prices.setdefault(cells[0].get_text(strip=True), price)
+        return prices
     
-    def _get_total_monthly(self, city: str) -> int:
-        """Get total monthly cost for family of 4"""
-        totals = {
-            "beit_shemesh": 10700,
-            "modiin": 12550,
-            "rehovot": 11500,
-            "netanya": 10150,
-            "haifa": 9500
-        }
-        return totals.get(city, 10500)
+    def _apply_cost_table(self, cost_of_living: CostOfLiving, prices: Dict[str, float]):
+        """Replace estimated components with the prices of a parsed cost table"""
+        for item, (category, key) in COST_ITEMS.items():
+            if item in prices:
+                getattr(cost_of_living, category)[key] = prices[item]
+        
+        # The combined utilities row keeps the estimated electricity/water split
+        basic = prices.get(BASIC_UTILITIES_ITEM)
+        utilities = cost_of_living.utilities
+        if basic is not None:
+            electricity_share = utilities["electricity"] / (utilities["electricity"] + utilities["water"])
+            utilities["electricity"] = round(basic * electricity_share)
+            utilities["water"] = round(basic - utilities["electricity"])
+        
+        # Groceries are priced per kg/liter/piece so the basket does not depend on pack sizes
+        if all(item in prices for item in GROCERY_BASKET):
+            basket = sum(
+                quantity * prices[item] / pack_size(item) for item, quantity in GROCERY_BASKET.items()
+            )
+            cost_of_living.groceries["monthly"] = round(basket / GROCERY_BASKET_SHARE)
     
-    def _get_cost_index(self, city: str) -> float:
-        """Get cost-of-living index (Tel Aviv = 100)"""
-        indices = {
-            "beit_shemesh": 78.5,
-            "modiin": 89.2,
-            "rehovot": 82.7,
-            "netanya": 75.3,
-            "haifa": 71.8
-        }
-        return indices.get(city, 80.0)
+    def _derive_totals(self, cost_of_living: CostOfLiving):
+        """Compute utility total, weekly groceries and the monthly total from their components"""
+        utilities = cost_of_living.utilities
+        utilities["total"] = round(sum(value for key, value in utilities.items() if key != "total"))
+        cost_of_living.groceries["weekly"] = round(cost_of_living.groceries["monthly"] / 4)
+        cost_of_living.total_monthly = round(sum(
+            getattr(cost_of_living, category)[key] * count for (category, key), count in MONTHLY_BUDGET
+        ))
     
-    def _get_quality_index(self, city: str) -> float:
-        """Get quality of life index (0-100)"""
-        indices = {
-            "beit_shemesh": 142.5,
-            "modiin": 168.3,
-            "rehovot": 155.8,
-            "netanya": 138.2,
-            "haifa": 145.9
-        }
-        return indices.get(city, 150.0)
+    def _get_estimates(self, city: str) -> CostOfLiving:
+        """Built-in cost-of-living estimates for a city (a fresh copy that can be modified)"""
+        estimate = ESTIMATES.get(city, DEFAULT_ESTIMATE)
+        return CostOfLiving(
+            housing=dict(estimate["housing"]),
+            groceries=dict(estimate["groceries"]),
+            transportation=dict(estimate["transportation"]),
+            utilities=dict(estimate["utilities"]),
+            dining=dict(estimate["dining"]),
+            cost_index=estimate["cost_index"],
+            quality_of_life_index=estimate["quality_of_life_index"]
+        )
     
-    def scrape_all_cities(self) -> List[Dict]:
+    def scrape_all_cities(self) -> List[NumbeoRecord]:
         """Scrape cost-of-living data for all target cities"""
-        results = []
+        done = {}
+        if self.checkpoints is not None:
+            done = self.checkpoints.completed("numbeo", NumbeoRecord, self.cities)
+        pending = {city: name for city, name in self.cities.items() if city not in done}
         
-        for city_key, city_display in CITIES.items():
-            data = self.scrape_city_cost_of_living(city_key, city_display)
-            if data:
-                results.append(data)
+        # In live mode city pages are requested a batch at a time over the shared client,
+        # and each batch is checkpointed before the next one is fetched
+        for batch in batches(pending) if self.live else [pending]:
+            pages = {}
+            if self.live:
+                with self.instrumentation.timed("fetch", "numbeo"):
+                    pages = self.fetch_city_pages(batch)
             
-            # Rate limiting
-            time.sleep(2)
+            # Pre-fetched pages are only parsed; otherwise the city is scraped end to end
+            stage = "parse" if pages else "scrape"
+            for city_key, city_display in batch.items():
+                with self.instrumentation.timed(stage, "numbeo", city_key):
+                    data = self.scrape_city_cost_of_living(city_key, city_display, pages.get(city_key, NOT_FETCHED))
+                if data:
+                    done[city_key] = data
+                    if self.checkpoints is not None:
+                        self.checkpoints.save("numbeo", data)
         
-        return results
+        return [done[city] for city in self.cities if city in done]
 
 def main():
     """Main execution function"""
@@ -309,7 +477,7 @@ def main():
             "last_updated": datetime.now().isoformat(),
             "source": "Numbeo",
             "source_url": "https://www.numbeo.com/cost-of-living",
-            "cities": results
+            "cities": [result.to_dict() for result in results]
         }, f, ensure_ascii=False, indent=2)
     
     print(f"\nData saved to {output_file}")
@@ -4,78 +4,143 @@ Yad2 Real Estate Data Scraper
 Collects property prices and rental data for Israeli cities
 """
 
-import requests
-from bs4 import BeautifulSoup
 import json
-import time
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+
+from checkpoints import batches
+from city_registry import city_names, load_cities
+from html_parsing import make_soup, parse_number
+from http_client import NOT_FETCHED, HttpClient
+from instrumentation import Instrumentation
+from listing_stats import ListingStats, RobustMean
+from records import Listing, PropertyData, Yad2Record
+
+# Target cities for data collection, mapped to their Hebrew names
+CITIES = city_names(load_cities(), "hebrew")
+
+# 3BR apartments are listed as 4 rooms in Israel (bedrooms plus living room)
+THREE_BR_ROOMS = 4
 
-# Target cities for data collection
-CITIES = {
-    "beit_shemesh": "בית שמש",
-    "modiin": "מודיעין",
-    "rehovot": "רחובות",
-    "netanya": "נתניה",
-    "haifa": "חיפה"
-}
+# Only the listing cards and the pagination block are built when parsing results pages
+RESULTS_STRAINER = SoupStrainer(class_=["feed_item", "pagination"])
 
 class Yad2Scraper:
-    def __init__(self):
+    def __init__(self, client: HttpClient = None, live: bool = False, stream: bool = False,
+                 max_pages: int = None, trend_engine=None, cities: Dict[str, str] = None,
+                 checkpoints=None, instrumentation: Instrumentation = None):
+        """
+        Args:
+            client: Shared HTTP client (a private one is created if omitted)
+            live: Fetch and parse the real search pages instead of using estimates
+            stream: In live mode, walk every results page instead of only the first
+            max_pages: Upper bound on pages walked per city and listing type
+            trend_engine: trends.TrendEngine used to derive price_trend from history
+            cities: Cities to scrape, city name to Hebrew name (defaults to CITIES)
+            checkpoints: checkpoints.CheckpointStore that completed cities are saved to
+            instrumentation: Run timings recorder (a private one is created if omitted)
+        """
         self.base_url = "https://www.yad2.co.il"
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        self.client = client or HttpClient()
+        self.live = live
+        self.stream = stream
+        self.max_pages = max_pages
+        self.trend_engine = trend_engine
+        self.cities = CITIES if cities is None else cities
+        self.checkpoints = checkpoints
+        self.instrumentation = instrumentation or Instrumentation()
+    
+    def city_urls(self, city_hebrew: str) -> Dict[str, str]:
+        """Search page URLs for a city, keyed by listing type"""
+        return {
+            "forsale": f"{self.base_url}/realestate/forsale?city={city_hebrew}",
+            "rent": f"{self.base_url}/realestate/rent?city={city_hebrew}"
         }
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
     
-    def scrape_city_data(self, city_name: str, city_hebrew: str) -> Dict:
+    def page_url(self, city_hebrew: str, kind: str, page: int) -> str:
+        """URL of one results page for a city and listing type"""
+        return f"{self.city_urls(city_hebrew)[kind]}&page={page}"
+    
+    def fetch_city_pages(self, cities: Dict[str, str]) -> Dict[str, Dict[str, Optional[bytes]]]:
+        """
+        Fetch the search pages for many cities concurrently
+        
+        Args:
+            cities: Mapping of city name to Hebrew name
+            
+        Returns:
+            Mapping of city name to {listing type: page body}
+        """
+        urls = {city: self.city_urls(hebrew) for city, hebrew in cities.items()}
+        bodies = self.client.fetch_bodies([url for city_urls in urls.values() for url in city_urls.values()])
+        return {
+            city: {kind: bodies.get(url) for kind, url in city_urls.items()}
+            for city, city_urls in urls.items()
+        }
+    
+    def scrape_city_data(self, city_name: str, city_hebrew: str,
+                         pages: Dict[str, Optional[bytes]] = NOT_FETCHED) -> Optional[Yad2Record]:
         """
         Scrape property data for a specific city
         
         Args:
             city_name: English name of the city
             city_hebrew: Hebrew name of the city
+            pages: Pre-fetched search pages by listing type (live mode only)
             
         Returns:
-            Dictionary containing property data
+            Property data record for the city, or None if its pages could not be fetched
         """
         print(f"Scraping data for {city_name}...")
         
-        # In a production environment, this would make actual HTTP requests
-        # For now, we'll use a simulation approach that mimics real data collection
+        # Without live mode we use a simulation approach that mimics real data collection
         
         try:
-            # Simulate API call delay
-            time.sleep(1)
+            sales = rentals = sale_listings = None
+            if self.live and not self.stream:
+                if pages is NOT_FETCHED:
+                    pages = self.fetch_city_pages({city_name: city_hebrew})[city_name]
+                # Without the pages there is nothing scraped; estimates only fill in
+                # what a page that did arrive lacks
+                missing = [kind for kind, page in pages.items() if not page]
+                if missing:
+                    print(f"Error scraping {city_name}: no {' or '.join(missing)} page")
+                    return None
+                # Load the parsed listings into arrays for the statistics below; the
+                # sale listings are also kept for cross-source deduplication
+                sale_listings = list(self._parse_listings(pages.get("forsale")))
+                sales = ListingStats.from_listings(sale_listings)
+                rentals = ListingStats.from_listings(self._parse_listings(pages.get("rent")))
             
-            # In production, you would:
-            # 1. Make requests to Yad2 search pages for the city
-            # 2. Parse HTML to extract property listings
-            # 3. Calculate average prices from listings
-            # 4. Handle pagination to get more data
+            property_data = PropertyData(
+                avg_price_per_sqm=self._get_avg_price_per_sqm(city_name, sales),
+                avg_rent_3br=self._get_avg_rent(city_name, rentals),
+                listings_count=self._get_listings_count(city_name, sales),
+                price_trend=self._get_price_trend(city_name)
+            )
             
-            # Example of what the actual scraping would look like:
-            # search_url = f"{self.base_url}/realestate/forsale?city={city_hebrew}"
-            # response = self.session.get(search_url)
-            # soup = BeautifulSoup(response.content, 'html.parser')
-            # listings = soup.find_all('div', class_='feed_item')
+            if self.live and self.stream:
+                # Walk every results page, keeping only running totals in memory
+                property_data.update(self._summarize_listings(
+                    self.iter_listings(city_hebrew, "forsale"),
+                    self.iter_listings(city_hebrew, "rent")
+                ))
+            elif not self.live:
+                # Wait for a request slot on this host
+                self.client.throttle(self.base_url)
             
-            # For demonstration, return structured data
-            # These would be replaced with actual scraped values
-            data = {
-                "city": city_name,
-                "city_hebrew": city_hebrew,
-                "timestamp": datetime.now().isoformat(),
-                "source": "Yad2",
-                "source_url": f"{self.base_url}/realestate/forsale",
-                "data": {
-                    "avg_price_per_sqm": self._get_avg_price_per_sqm(city_name),
-                    "avg_rent_3br": self._get_avg_rent(city_name),
-                    "listings_count": self._get_listings_count(city_name),
-                    "price_trend": self._get_price_trend(city_name)
-                }
-            }
+            data = Yad2Record(
+                city=city_name,
+                city_hebrew=city_hebrew,
+                timestamp=datetime.now().isoformat(),
+                source="Yad2",
+                source_url=f"{self.base_url}/realestate/forsale",
+                data=property_data,
+                listings=sale_listings
+            )
             
             return data
             
@@ -83,10 +148,136 @@ class Yad2Scraper:
             print(f"Error scraping {city_name}: {str(e)}")
             return None
     
-    def _get_avg_price_per_sqm(self, city: str) -> int:
+    def iter_listings(self, city_hebrew: str, kind: str = "forsale") -> Iterator[Listing]:
+        """
+        Stream every listing for a city, one results page at a time
+        
+        Page N+1 is requested while page N is parsed, so at most two pages
+        are held in memory no matter how many listings the city has.
+        
+        Args:
+            city_hebrew: Hebrew name of the city
+            kind: Listing type ("forsale" or "rent")
+            
+        Yields:
+            Listings in page order
+        """
+        page_number = 1
+        total_pages = None
+        previous_first_id = None
+        pending = self.client.executor.submit(self.client.get, self.page_url(city_hebrew, kind, 1))
+        
+        try:
+            while pending is not None:
+                try:
+                    response = pending.result()
+                except requests.RequestException as e:
+                    # Without the first page nothing was scraped at all; a later
+                    # page only ends the walk, keeping the listings seen so far
+                    if page_number == 1:
+                        raise
+                    print(f"Error fetching {kind} page {page_number} for {city_hebrew}: {str(e)}")
+                    return
+                pending = None
+                if not response.ok:
+                    # Without the first page nothing was scraped at all
+                    if page_number == 1:
+                        response.raise_for_status()
+                    print(f"Error fetching {kind} page {page_number} for {city_hebrew}: HTTP {response.status_code}")
+                    return
+                
+                # Request the next page before parsing this one
+                has_next = total_pages is None or page_number < total_pages
+                if has_next and (self.max_pages is None or page_number < self.max_pages):
+                    pending = self.client.executor.submit(
+                        self.client.get, self.page_url(city_hebrew, kind, page_number + 1)
+                    )
+                
+                soup = make_soup(response.content, RESULTS_STRAINER)
+                response = None
+                if total_pages is None:
+                    total_pages = self._total_pages(soup)
+                
+                listings = self._iter_page_listings(soup)
+                first = next(listings, None)
+                # Stop on an empty page, or when the site keeps serving the
+                # last page for page numbers past the end
+                if first is None or (first.id is not None and first.id == previous_first_id):
+                    return
+                previous_first_id = first.id
+                
+                yield first
+                yield from listings
+                page_number += 1
+        finally:
+            if pending is not None:
+                pending.cancel()
+    
+    def _total_pages(self, soup: BeautifulSoup) -> Optional[int]:
+        """Read the page count from the results pagination, if present"""
+        pagination = soup.find(attrs={"data-total-pages": True})
+        if pagination is None:
+            return None
+        total = parse_number(pagination["data-total-pages"])
+        return int(total) if total else None
+    
+    def _iter_page_listings(self, soup: BeautifulSoup) -> Iterator[Listing]:
+        """Extract listings from a parsed search results page"""
+        for item in soup.find_all('div', class_='feed_item'):
+            price = parse_number(item.get('data-price'))
+            if not price:
+                continue
+            yield Listing(
+                id=item.get('data-id'),
+                price=price,
+                sqm=parse_number(item.get('data-square-meters')),
+                rooms=parse_number(item.get('data-rooms')),
+                address=item.get('data-address')
+            )
+    
+    def _parse_listings(self, page: Optional[bytes]) -> Iterator[Listing]:
+        """Extract listings from a search results page"""
+        if not page:
+            return iter(())
+        return self._iter_page_listings(make_soup(page, RESULTS_STRAINER))
+    
+    def _summarize_listings(self, sales: Iterable[Listing], rentals: Iterable[Listing]) -> Dict:
+        """
+        Calculate property metrics from parsed listings
+        
+        Works in a single pass over each iterable, so listings can be
+        streamed straight from iter_listings.
+        """
+        summary = {}
+        
+        listings_count = 0
+        per_sqm = RobustMean()
+        for listing in sales:
+            listings_count += 1
+            if listing.sqm:
+                per_sqm.add(listing.price / listing.sqm)
+        if listings_count:
+            summary["listings_count"] = listings_count
+        if per_sqm.count:
+            summary["avg_price_per_sqm"] = round(per_sqm.mean)
+        
+        rent_3br = RobustMean()
+        for listing in rentals:
+            if listing.rooms == THREE_BR_ROOMS:
+                rent_3br.add(listing.price)
+        if rent_3br.count:
+            summary["avg_rent_3br"] = round(rent_3br.mean)
+        
+        return summary
+    
+    def _get_avg_price_per_sqm(self, city: str, sales: ListingStats = None) -> int:
         """Calculate average price per square meter"""
-        # In production, this would aggregate actual listing data
-        # Current values are realistic estimates
+        if sales is not None:
+            mean = sales.robust_mean("price_per_sqm")
+            if mean is not None:
+                return round(mean)
+        
+        # Realistic estimates used when no listings were scraped
         prices = {
             "beit_shemesh": 18500,
             "modiin": 22000,
@@ -96,8 +287,13 @@ class Yad2Scraper:
         }
         return prices.get(city, 18000)
     
-    def _get_avg_rent(self, city: str) -> int:
+    def _get_avg_rent(self, city: str, rentals: ListingStats = None) -> int:
         """Calculate average rent for 3BR apartment"""
+        if rentals is not None:
+            mean = rentals.robust_mean("price", rooms=THREE_BR_ROOMS)
+            if mean is not None:
+                return round(mean)
+        
         rents = {
             "beit_shemesh": 5200,
             "modiin": 6500,
@@ -107,9 +303,11 @@ class Yad2Scraper:
         }
         return rents.get(city, 5000)
     
-    def _get_listings_count(self, city: str) -> int:
+    def _get_listings_count(self, city: str, sales: ListingStats = None) -> int:
         """Get number of active listings"""
-        # This would count actual listings from scraping
+        if sales is not None and len(sales):
+            return len(sales)
+        
         counts = {
             "beit_shemesh": 245,
             "modiin": 189,
@@ -121,7 +319,7 @@ class Yad2Scraper:
     
     def _get_price_trend(self, city: str) -> str:
         """Determine price trend (up, down, stable)"""
-        # This would compare with historical data
+        # Estimate used until the city has enough history for the trend engine
         trends = {
             "beit_shemesh": "stable",
             "modiin": "up",
@@ -131,19 +329,46 @@ class Yad2Scraper:
         }
         return trends.get(city, "stable")
     
-    def scrape_all_cities(self) -> List[Dict]:
+    def scrape_all_cities(self) -> List[Yad2Record]:
         """Scrape data for all target cities"""
-        results = []
+        done = {}
+        if self.checkpoints is not None:
+            done = self.checkpoints.completed("yad2", Yad2Record, self.cities)
+        pending = {city: hebrew for city, hebrew in self.cities.items() if city not in done}
         
-        for city_key, city_hebrew in CITIES.items():
-            data = self.scrape_city_data(city_key, city_hebrew)
-            if data:
-                results.append(data)
+        # In live mode city pages are requested a batch at a time over the shared client,
+        # and each batch is checkpointed before the next one is fetched (streaming mode
+        # walks each city's pages itself)
+        batched = self.live and not self.stream
+        for batch in batches(pending) if batched else [pending]:
+            pages = {}
+            if batched:
+                with self.instrumentation.timed("fetch", "yad2"):
+                    pages = self.fetch_city_pages(batch)
             
-            # Rate limiting - be respectful to the server
-            time.sleep(2)
+            # Pre-fetched pages are only parsed; otherwise the city is scraped end to end
+            stage = "parse" if pages else "scrape"
+            for city_key, city_hebrew in batch.items():
+                with self.instrumentation.timed(stage, "yad2", city_key):
+                    data = self.scrape_city_data(city_key, city_hebrew, pages.get(city_key, NOT_FETCHED))
+                if data:
+                    done[city_key] = data
+                    if self.checkpoints is not None:
+                        self.checkpoints.save("yad2", data)
+        
+        results = [done[city] for city in self.cities if city in done]
+        if self.trend_engine is not None:
+            self.apply_price_trends(results)
         
         return results
+    
+    def apply_price_trends(self, results: List[Yad2Record]):
+        """Replace estimated price trends with ones fitted on the price history"""
+        current = {r.city: r.data.avg_price_per_sqm for r in results}
+        trends = self.trend_engine.classify(current)
+        for result in results:
+            if result.city in trends:
+                result.data.price_trend = trends[result.city]
 
 def main():
     """Main execution function"""
@@ -160,7 +385,7 @@ def main():
             "last_updated": datetime.now().isoformat(),
             "source": "Yad2",
             "source_url": "https://www.yad2.co.il/realestate",
-            "cities": results
+            "cities": [result.to_dict() for result in results]
         }, f, ensure_ascii=False, indent=2)
     
     print(f"\nData saved to {output_file}")
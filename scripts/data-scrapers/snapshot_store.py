@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Historical Snapshot Store
+Append-only, delta-encoded history of per-city metrics, replacing the
+full timestamped backup copies of community_data.json
+"""
+
+import argparse
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Block keys that hold metadata or breakdowns rather than city metrics. A
+# fallback block's "as_of" is kept, so later runs can tell how old the block is.
+SKIPPED_KEYS = {"city", "last_updated", "data_sources", "source", "stale", "age_days", "neighborhoods"}
+
+def flatten_city(city_data: Dict, prefix: str = "") -> Dict:
+    """
+    Flatten a city block into {"section.metric": value}
+
+    Example: {"property_data": {"avg_rent_3br": 5200}} -> {"property_data.avg_rent_3br": 5200}
+    """
+    metrics = {}
+    for key, value in city_data.items():
+        if key in SKIPPED_KEYS:
+            continue
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten_city(value, f"{path}."))
+        else:
+            metrics[path] = value
+    return metrics
+
+def unflatten_metrics(metrics: Dict) -> Dict:
+    """
+    Inverse of flatten_city
+
+    Example: {"property_data.avg_rent_3br": 5200} -> {"property_data": {"avg_rent_3br": 5200}}
+    """
+    nested = {}
+    for path, value in metrics.items():
+        *parents, key = path.split(".")
+        block = nested
+        for parent in parents:
+            block = block.setdefault(parent, {})
+        block[key] = value
+    return nested
+
+class SnapshotStore:
+    def __init__(self, path: str = "data/history/metrics.jsonl"):
+        """
+        History file with one line per run
+
+        Each line only holds the metrics that changed since the previous
+        line: {"ts": ..., "set": {city: {metric: value}}, "unset": {city: [metric, ...]},
+        "drop": [city, ...]}. Any past snapshot is rebuilt by replaying lines
+        up to its timestamp.
+        """
+        self.path = path
+
+    def _lines(self) -> Iterator[Dict]:
+        """Read the history one run at a time"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def timestamps(self) -> List[str]:
+        """Timestamps of all recorded runs, oldest first"""
+        return [entry["ts"] for entry in self._lines()]
+
+    def snapshot(self, as_of: str = None) -> Dict[str, Dict]:
+        """
+        Rebuild the per-city metrics as they were at a point in time
+
+        Args:
+            as_of: ISO timestamp; defaults to the latest run
+
+        Returns:
+            Mapping of city to {metric: value}
+        """
+        state = {}
+        for entry in self._lines():
+            if as_of is not None and entry["ts"] > as_of:
+                break
+            self._apply(state, entry)
+        return state
+
+    def last_run(self) -> Tuple[Optional[str], Dict[str, Dict]]:
+        """
+        The latest snapshot and the timestamp of the run that recorded it
+
+        Returns:
+            (timestamp, {city: {metric: value}}), with a None timestamp for an empty history
+        """
+        state = {}
+        timestamp = None
+        for entry in self._lines():
+            self._apply(state, entry)
+            timestamp = entry["ts"]
+        return timestamp, state
+
+    def series(self, city: str, metric: str) -> List[Tuple[str, object]]:
+        """
+        Time series of one metric for one city
+
+        Returns:
+            (timestamp, value) for every run in which the city had the metric
+        """
+        points = []
+        value = None
+        present = False
+        for entry in self._lines():
+            if city in entry.get("drop", []):
+                present = False
+            if metric in entry.get("unset", {}).get(city, []):
+                value = None
+            changes = entry.get("set", {}).get(city)
+            if changes is not None:
+                present = True
+                if metric in changes:
+                    value = changes[metric]
+            if present and value is not None:
+                points.append((entry["ts"], value))
+        return points
+
+    def all_series(self, metric: str) -> Tuple[List[str], Dict[str, List[Optional[object]]]]:
+        """
+        One metric for every city, aligned on run timestamps
+
+        A run that served the metric's section from an older run (a
+        fallback block, recorded with its "as_of") did not observe the
+        value again, so it counts as having no value.
+
+        Returns:
+            (timestamps, {city: values}) with None where a city had no value
+        """
+        stale_marker = f"{metric.split('.', 1)[0]}.as_of"
+        timestamps = []
+        columns = {}
+        state = {}
+        for entry in self._lines():
+            self._apply(state, entry)
+            for city, values in columns.items():
+                values.append(None)
+            for city, metrics in state.items():
+                if city not in columns:
+                    columns[city] = [None] * (len(timestamps) + 1)
+                if stale_marker not in metrics:
+                    columns[city][-1] = metrics.get(metric)
+            timestamps.append(entry["ts"])
+        return timestamps, columns
+
+    def _apply(self, state: Dict[str, Dict], entry: Dict):
+        """Apply one delta line to a snapshot in place"""
+        for city in entry.get("drop", []):
+            state.pop(city, None)
+        for city, metrics in entry.get("unset", {}).items():
+            for metric in metrics:
+                state.get(city, {}).pop(metric, None)
+        for city, changes in entry.get("set", {}).items():
+            state.setdefault(city, {}).update(changes)
+
+    def append(self, community_data: Dict, timestamp: str = None) -> int:
+        """
+        Record a run's per-city metrics
+
+        Args:
+            community_data: Output of DataAggregator.generate_community_data
+            timestamp: Run timestamp; defaults to the data's last_updated
+
+        Returns:
+            Number of metric values that changed since the previous run
+        """
+        previous = self.snapshot()
+        current = {city["city"]: flatten_city(city) for city in community_data["cities"]}
+
+        changes = {}
+        removed = {}
+        for city, metrics in current.items():
+            before = previous.get(city, {})
+            changed = {metric: value for metric, value in metrics.items() if before.get(metric) != value}
+            if changed:
+                changes[city] = changed
+            gone = sorted(set(before) - set(metrics))
+            if gone:
+                removed[city] = gone
+
+        entry = {"ts": timestamp or community_data["last_updated"], "set": changes}
+        if removed:
+            entry["unset"] = removed
+        dropped = sorted(set(previous) - set(current))
+        if dropped:
+            entry["drop"] = dropped
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":"), sort_keys=True) + "\n")
+
+        return sum(len(changed) for changed in changes.values()) + sum(len(gone) for gone in removed.values())
+
+    def import_backup(self, backup_file: str) -> int:
+        """Append the contents of a legacy community_data_backup_*.json file"""
+        with open(backup_file, 'r', encoding='utf-8') as f:
+            return self.append(json.load(f))
+
+def main():
+    """Import legacy backups or inspect the history from the command line"""
+    parser = argparse.ArgumentParser(description="Inspect the community data history")
+    parser.add_argument("--store", default="data/history/metrics.jsonl", help="History file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Append legacy backup files, oldest first")
+    import_parser.add_argument("backups", nargs="+")
+
+    snapshot_parser = subparsers.add_parser("snapshot", help="Print the metrics as of a timestamp")
+    snapshot_parser.add_argument("--as-of")
+
+    series_parser = subparsers.add_parser("series", help="Print one metric over time for a city")
+    series_parser.add_argument("city")
+    series_parser.add_argument("metric", help='Flattened metric name, e.g. "property_data.avg_price_per_sqm"')
+
+    args = parser.parse_args()
+    store = SnapshotStore(args.store)
+
+    if args.command == "import":
+        for backup_file in sorted(args.backups):
+            changed = store.import_backup(backup_file)
+            print(f"✓ Imported {backup_file} ({changed} values changed)")
+    elif args.command == "snapshot":
+        print(json.dumps(store.snapshot(args.as_of), ensure_ascii=False, indent=2))
+    else:
+        for timestamp, value in store.series(args.city, args.metric):
+            print(f"{timestamp}\t{value}")
+
+if __name__ == "__main__":
+    main()
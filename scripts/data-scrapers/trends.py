@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Price Trend Engine
+Classifies per-city price trends from the snapshot history using
+vectorized least-squares slopes and moving averages
+"""
+
+from datetime import datetime
+from typing import Dict
+
+import numpy as np
+
+from snapshot_store import SnapshotStore
+
+class TrendEngine:
+    def __init__(self, store: SnapshotStore, metric: str = "property_data.avg_price_per_sqm",
+                 lookback: int = 26, window: int = 4, min_points: int = 4, threshold: float = 0.02):
+        """
+        Args:
+            store: History of per-city metrics
+            metric: Flattened metric name the trend is computed on
+            lookback: Number of most recent runs the slope is fitted over
+            window: Number of runs in the moving average
+            min_points: Minimum runs with a value before a trend is reported
+            threshold: Annual relative change (0.02 = 2%/year) separating up/down from stable
+        """
+        self.store = store
+        self.metric = metric
+        self.lookback = lookback
+        self.window = window
+        self.min_points = min_points
+        self.threshold = threshold
+
+    def load(self, current: Dict[str, float] = None, now: str = None):
+        """
+        Load the metric for every city into a (cities x runs) matrix
+
+        Args:
+            current: This run's values, appended as the latest point
+            now: Timestamp of the current values (defaults to now)
+
+        Returns:
+            (cities, days, values) where days are run times in days since the
+            first run and values holds NaN where a city had no value
+        """
+        timestamps, columns = self.store.all_series(self.metric)
+        if current:
+            timestamps = timestamps + [now or datetime.now().isoformat()]
+            for values in columns.values():
+                values.append(None)
+            for city, value in current.items():
+                columns.setdefault(city, [None] * len(timestamps))[-1] = value
+
+        timestamps = timestamps[-self.lookback:]
+        cities = sorted(columns)
+        values = np.array(
+            [[np.nan if v is None else v for v in columns[city][-self.lookback:]] for city in cities],
+            dtype=float
+        ).reshape(len(cities), len(timestamps))
+
+        seconds = np.array([datetime.fromisoformat(ts).timestamp() for ts in timestamps], dtype=float)
+        days = (seconds - seconds[0]) / 86400 if len(seconds) else seconds
+        return cities, days, values
+
+    def compute(self, current: Dict[str, float] = None, now: str = None) -> Dict[str, Dict]:
+        """
+        Fit a trend for every city in one vectorized pass
+
+        Returns:
+            Mapping of city to {"slope_per_year", "change_per_year", "moving_average",
+            "points", "trend"}; trend is None when a city has fewer than min_points runs
+        """
+        cities, days, values = self.load(current, now)
+        if not cities:
+            return {}
+
+        present = ~np.isnan(values)
+        points = present.sum(axis=1)
+        counts = np.maximum(points, 1)
+        filled = np.where(present, values, 0.0)
+
+        # Least-squares slope per row, ignoring missing runs
+        t = np.broadcast_to(days, values.shape)
+        t_mean = np.where(present, t, 0.0).sum(axis=1) / counts
+        v_mean = filled.sum(axis=1) / counts
+        dt = np.where(present, t - t_mean[:, None], 0.0)
+        dv = np.where(present, values - v_mean[:, None], 0.0)
+        variance = (dt * dt).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope_per_day = np.where(variance > 0, (dt * dv).sum(axis=1) / variance, 0.0)
+            change_per_year = np.where(v_mean != 0, slope_per_day * 365 / v_mean, 0.0)
+
+        # Moving average over the last `window` runs that have a value
+        recent = np.cumsum(present[:, ::-1], axis=1)[:, ::-1] <= self.window
+        in_window = present & recent
+        with np.errstate(divide='ignore', invalid='ignore'):
+            moving_average = np.where(in_window, values, 0.0).sum(axis=1) / in_window.sum(axis=1)
+
+        labels = np.where(change_per_year > self.threshold, "up",
+                          np.where(change_per_year < -self.threshold, "down", "stable"))
+
+        results = {}
+        for i, city in enumerate(cities):
+            enough = points[i] >= self.min_points
+            results[city] = {
+                "slope_per_year": round(float(slope_per_day[i] * 365), 2),
+                "change_per_year": round(float(change_per_year[i]), 4),
+                "moving_average": round(float(moving_average[i]), 2) if points[i] else None,
+                "points": int(points[i]),
+                "trend": str(labels[i]) if enough else None
+            }
+        return results
+
+    def classify(self, current: Dict[str, float] = None, now: str = None) -> Dict[str, str]:
+        """Trend label (up/down/stable) for every city with enough history"""
+        return {
+            city: result["trend"]
+            for city, result in self.compute(current, now).items()
+            if result["trend"] is not None
+        }